@@ -0,0 +1,78 @@
+"""
+One-off setup tasks kept out of the request workers' boot path.
+
+Creating the schema and seeding the demo user used to run in every
+worker's startup; they are now an explicit command::
+
+    python -m app.bootstrap migrate [--seed-demo]
+
+(``python start.py migrate`` and ``python main.py`` run it for you).
+Workers only repeat them when ``AUTO_MIGRATE`` / ``SEED_DEMO_USER`` are set.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+
+from app.database import Base, SessionLocal, engine
+from app.models import User
+
+
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "false").lower() in ("1", "true", "yes")
+SEED_DEMO_USER = os.getenv("SEED_DEMO_USER", "false").lower() in ("1", "true", "yes")
+
+DEMO_EMAIL = "demo.user@example.com"
+DEMO_PASSWORD = "DemoPass123!"
+# bcrypt (cost 12) of DEMO_PASSWORD, precomputed so seeding does no hashing.
+# If BCRYPT_ROUNDS differs it is upgraded on the first login.
+DEMO_PASSWORD_HASH = "$2b$12$CGGkqj7DtI6uOKqMxCe9beXMGXkrwuYhrhWTFeYgA0kj8aJUf7ssi"
+
+
+def migrate() -> None:
+    """Create any missing tables."""
+    Base.metadata.create_all(bind=engine)
+    print("✅ Database schema is up to date")
+
+
+def seed_demo_user() -> None:
+    """Create the demo login for development if it does not exist."""
+    db = SessionLocal()
+    try:
+        existing = db.query(User.id).filter(User.email == DEMO_EMAIL).first()
+        if existing:
+            print("ℹ️  Demo user already exists:", DEMO_EMAIL)
+            return
+        db.add(
+            User(
+                email=DEMO_EMAIL,
+                full_name="Demo User",
+                username="demouser",
+                hashed_password=DEMO_PASSWORD_HASH,
+            )
+        )
+        db.commit()
+        print("✅ Seeded demo user:", DEMO_EMAIL, "/", DEMO_PASSWORD)
+    except Exception as e:
+        print("⚠️  Failed to seed demo user:", e)
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="TuneEng setup tasks")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = subcommands.add_parser("migrate", help="Create database tables")
+    migrate_parser.add_argument(
+        "--seed-demo", action="store_true", help=f"Also create {DEMO_EMAIL}"
+    )
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        migrate()
+        if args.seed_demo:
+            seed_demo_user()
+
+
+if __name__ == "__main__":
+    main()
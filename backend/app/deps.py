@@ -0,0 +1,229 @@
+"""
+Shared FastAPI dependencies.
+
+``CurrentUser`` is the single way routers obtain the authenticated user:
+the bearer token is decoded once, the user row is loaded at most once per
+request (the result is kept on ``request.state``), and an optional
+short-lived in-process cache lets hot clients skip the database entirely.
+"""
+
+from __future__ import annotations
+
+import ipaddress
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Annotated, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_async_read_db
+from app.metrics import timed
+from app.models import User
+from app.security import decode_access_token
+
+
+# Comma-separated emails allowed to use admin-only endpoints.
+ADMIN_EMAILS = frozenset(
+    email.strip().lower()
+    for email in os.getenv("ADMIN_EMAILS", "").split(",")
+    if email.strip()
+)
+
+# Comma-separated addresses/networks allowed to scrape /api/metrics without
+# a token. Matched against the socket peer, never X-Forwarded-For.
+METRICS_ALLOWED_IPS = tuple(
+    ipaddress.ip_network(entry.strip(), strict=False)
+    for entry in os.getenv("METRICS_ALLOWED_IPS", "127.0.0.1,::1").split(",")
+    if entry.strip()
+)
+
+# Seconds a loaded user may be reused by later requests; 0 disables the cache.
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "0"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+
+bearer_scheme = HTTPBearer()
+optional_bearer_scheme = HTTPBearer(auto_error=False)
+
+
+@dataclass(frozen=True)
+class AuthenticatedUser:
+    """
+    Immutable snapshot of the authenticated user.
+
+    A plain value object rather than the ORM instance, so it can be shared
+    between requests and sessions without detached-instance surprises.
+    """
+
+    id: int
+    email: str
+    full_name: str
+    username: Optional[str] = None
+
+    @classmethod
+    def from_orm_user(cls, user: User) -> "AuthenticatedUser":
+        return cls(
+            id=user.id,
+            email=user.email,
+            full_name=user.full_name,
+            username=user.username,
+        )
+
+
+class UserCache:
+    """
+    Small LRU of recently loaded users with a fixed time-to-live.
+
+    Entries are never invalidated early: nothing in the API changes the
+    cached fields (id, email, name, username), so the TTL alone bounds how
+    stale an entry can be.
+    """
+
+    def __init__(self, ttl_seconds: float, max_size: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries: "OrderedDict[int, Tuple[float, AuthenticatedUser]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_size > 0
+
+    def get(self, user_id: int) -> Optional[AuthenticatedUser]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return entry[1]
+
+    def put(self, user: AuthenticatedUser) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[user.id] = (time.monotonic() + self.ttl_seconds, user)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache(USER_CACHE_TTL_SECONDS, USER_CACHE_SIZE)
+
+
+async def get_current_user(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+    db: AsyncSession = Depends(get_async_read_db),
+) -> AuthenticatedUser:
+    """
+    Resolve the authenticated user from the ``Authorization: Bearer`` header.
+
+    Raises:
+        HTTPException 401: if the token is invalid/expired or the user no
+        longer exists.
+    """
+    cached = getattr(request.state, "current_user", None)
+    if cached is not None:
+        return cached
+
+    with timed("auth"):
+        try:
+            payload = decode_access_token(credentials.credentials)
+            user_id = int(payload.get("sub"))
+        except Exception:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid or expired token",
+            )
+
+        current_user = user_cache.get(user_id)
+        if current_user is None:
+            user = await db.get(User, user_id)
+            if not user:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="User not found",
+                )
+            current_user = AuthenticatedUser.from_orm_user(user)
+            user_cache.put(current_user)
+
+    request.state.current_user = current_user
+    return current_user
+
+
+CurrentUser = Annotated[AuthenticatedUser, Depends(get_current_user)]
+
+
+async def get_optional_user(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_bearer_scheme),
+    db: AsyncSession = Depends(get_async_read_db),
+) -> Optional[AuthenticatedUser]:
+    """Like :func:`get_current_user`, but None for anonymous requests."""
+    if credentials is None:
+        return None
+    return await get_current_user(request, credentials, db)
+
+
+OptionalUser = Annotated[Optional[AuthenticatedUser], Depends(get_optional_user)]
+
+
+def is_admin(user: AuthenticatedUser) -> bool:
+    return user.email.lower() in ADMIN_EMAILS
+
+
+def require_admin(current_user: CurrentUser) -> AuthenticatedUser:
+    """
+    Allow only users listed in ``ADMIN_EMAILS``.
+
+    Raises:
+        HTTPException 403: for any other authenticated user.
+    """
+    if not is_admin(current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required",
+        )
+    return current_user
+
+
+AdminUser = Annotated[AuthenticatedUser, Depends(require_admin)]
+
+
+def _metrics_client_allowed(request: Request) -> bool:
+    if request.client is None:
+        return False
+    try:
+        address = ipaddress.ip_address(request.client.host)
+    except ValueError:
+        return False
+    return any(address in network for network in METRICS_ALLOWED_IPS)
+
+
+def require_metrics_access(request: Request, current_user: OptionalUser) -> None:
+    """
+    Allow clients on ``METRICS_ALLOWED_IPS`` (the Prometheus scraper) and admins.
+
+    Raises:
+        HTTPException 403: for anyone else.
+    """
+    if _metrics_client_allowed(request):
+        return
+    if current_user is None or not is_admin(current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Metrics access denied",
+        )
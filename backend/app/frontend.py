@@ -0,0 +1,236 @@
+"""
+Serving the built React frontend.
+
+``SpaShell`` keeps ``index.html`` in memory together with its gzip (and,
+when the optional ``brotli`` package is installed, brotli) encodings and a
+strong ETag, so client-side navigations are answered without touching the
+filesystem, and revalidations with a bare ``304``.
+
+``SpaDispatcher`` decides, per unmatched path, between the shell, a file
+from the root of the build (``favicon.ico``, ``sitemap.xml``, ...) and a
+404, using sets built at startup instead of per-request checks.
+
+Set ``FRONTEND_WATCH=true`` in development to pick up rebuilt files without
+restarting the server.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import hashlib
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+from starlette.routing import Mount
+
+if TYPE_CHECKING:
+    from app.static_assets import StaticAssets
+
+try:  # Optional: br is ~15-20% smaller than gzip for JS/HTML.
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+
+FRONTEND_WATCH = os.getenv("FRONTEND_WATCH", "false").lower() in ("1", "true", "yes")
+FRONTEND_WATCH_INTERVAL = float(os.getenv("FRONTEND_WATCH_INTERVAL", "1"))
+
+# Preferred order when the client accepts several encodings equally.
+SUPPORTED_ENCODINGS: Tuple[str, ...] = ("br", "gzip") if brotli is not None else ("gzip",)
+_ETAG_SUFFIX = {"identity": "", "gzip": "-gz", "br": "-br"}
+
+
+def negotiate_encoding(accept_encoding: Optional[str], available) -> str:
+    """
+    Pick the best of ``available`` encodings for an ``Accept-Encoding`` header.
+
+    Honors q-values (``gzip;q=0``) and ``*``; returns ``"identity"`` if no
+    compressed encoding is acceptable.
+    """
+    if not accept_encoding:
+        return "identity"
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[token] = quality
+    best, best_quality = "identity", 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        if encoding not in available:
+            continue
+        quality = weights.get(encoding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def etag_matches(if_none_match: Optional[str], etags) -> bool:
+    """True if an ``If-None-Match`` header matches any of ``etags``."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate in etags:
+            return True
+    return False
+
+
+def compress(data: bytes) -> Dict[str, bytes]:
+    """Encoded variants of ``data`` worth sending (smaller than the original)."""
+    variants = {"identity": data}
+    gzipped = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(gzipped) < len(data):
+        variants["gzip"] = gzipped
+    if brotli is not None:
+        encoded = brotli.compress(data, quality=11)
+        if len(encoded) < len(data):
+            variants["br"] = encoded
+    return variants
+
+
+class SpaShell:
+    """``index.html`` held in memory with its encodings and ETag."""
+
+    def __init__(self, index_path: Path):
+        self.index_path = Path(index_path)
+        self.variants: Dict[str, bytes] = {}
+        self.etags: Dict[str, str] = {}
+        self._signature: Optional[Tuple[int, int]] = None
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self.variants)
+
+    def _stat_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = self.index_path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self) -> bool:
+        """(Re)read the file; returns False if it does not exist."""
+        signature = self._stat_signature()
+        if signature is None:
+            self.variants, self.etags, self._signature = {}, {}, None
+            return False
+        data = self.index_path.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()[:32]
+        self.variants = compress(data)
+        self.etags = {name: f'"{digest}{_ETAG_SUFFIX[name]}"' for name in self.variants}
+        self._signature = signature
+        return True
+
+    def reload_if_changed(self) -> bool:
+        """Reload if the file's mtime/size changed; returns True if it did."""
+        signature = self._stat_signature()
+        if signature == self._signature:
+            return False
+        self.load()
+        return True
+
+    async def watch(
+        self,
+        interval_seconds: float = FRONTEND_WATCH_INTERVAL,
+        on_change: Optional[Callable[[], object]] = None,
+    ) -> None:
+        """
+        Background loop for development; cancel it on shutdown.
+
+        ``on_change`` runs (in a thread) after each reload, e.g. to reindex
+        the rest of the build.
+        """
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                if await asyncio.to_thread(self.reload_if_changed):
+                    print(f"🔄 Reloaded {self.index_path}")
+                    if on_change is not None:
+                        await asyncio.to_thread(on_change)
+            except OSError as e:
+                print(f"⚠️  Failed to reload {self.index_path}: {e}")
+
+    def response(self, request: Request) -> Optional[Response]:
+        """
+        Response for ``request``, or None if the frontend is not built.
+
+        The shell is revalidated on every navigation (``no-cache``) so a new
+        deploy is picked up immediately; unchanged shells cost a 304.
+        """
+        if not self.loaded and not self.load():
+            return None
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"), self.variants)
+        headers = {
+            "ETag": self.etags[encoding],
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+        if etag_matches(request.headers.get("if-none-match"), self.etags.values()):
+            return Response(status_code=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(self.variants[encoding], media_type="text/html", headers=headers)
+
+
+# Top-level path segments that never fall back to the SPA shell, even when
+# nothing is mounted there (e.g. the build has no images directory).
+RESERVED_PREFIXES: Tuple[str, ...] = ("api", "assets", "logos", "images")
+
+SERVE_SHELL = "shell"
+SERVE_FILE = "file"
+NOT_FOUND = "not_found"
+
+
+class SpaDispatcher:
+    """
+    Dispatch table for the catch-all SPA route.
+
+    Args:
+        static: Index of the build; its ``root_files`` are served directly.
+        reserved: First path segments that 404 instead of getting the shell
+            (API and mounted prefixes).
+    """
+
+    def __init__(self, static: "StaticAssets", reserved: Iterable[str] = RESERVED_PREFIXES):
+        self.static = static
+        self.reserved = frozenset(reserved)
+
+    @classmethod
+    def from_routes(cls, routes, static: "StaticAssets") -> "SpaDispatcher":
+        """Reserve :data:`RESERVED_PREFIXES` plus every mounted path's first segment."""
+        mounted = {
+            route.path.strip("/").split("/", 1)[0]
+            for route in routes
+            if isinstance(route, Mount) and route.path.strip("/")
+        }
+        return cls(static, set(RESERVED_PREFIXES) | mounted)
+
+    def resolve(self, full_path: str):
+        """Return ``(SERVE_SHELL | SERVE_FILE | NOT_FOUND, file entry or None)``."""
+        if full_path.partition("/")[0] in self.reserved:
+            return NOT_FOUND, None
+        # index.html is always the in-memory shell, never a cacheable file.
+        if full_path in self.static.root_files and full_path != "index.html":
+            return SERVE_FILE, self.static.lookup(full_path)
+        # Client-side routes have no file extension; a missing file
+        # (favicon.ico, wp-login.php, ...) should not get the HTML shell.
+        if "." in full_path.rpartition("/")[2] and full_path != "index.html":
+            return NOT_FOUND, None
+        return SERVE_SHELL, None
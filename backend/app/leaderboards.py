@@ -0,0 +1,874 @@
+"""
+Materialized leaderboards.
+
+Scores live in two places:
+
+- ``leaderboard_scores`` (one row per user and skill, plus an ``overall``
+  row) holds running totals. Scoring an attempt adds its points with a
+  single UPSERT per row, so totals are never re-summed from
+  ``practice_attempts``.
+- Each worker keeps a :class:`Board` per skill and overall: a dict of
+  scores plus a :class:`~app.ranking.RankIndex` ordered by
+  ``(-score, user_id)``. Boards are built from the table once at startup;
+  after that an update is an O(log n) remove/insert, a top-N read walks
+  the first N keys of the index, and a user's rank is a position lookup
+  in it.
+
+Daily, weekly and monthly boards are rolling windows over the last 1, 7
+and 30 days. Attempts also add to per-day rows in ``leaderboard_buckets``;
+each worker keeps the last 30 days of those buckets in memory and, when
+the date changes, subtracts the bucket that just left each window instead
+of re-summing it. ``compact_buckets`` (run in the background every
+``LEADERBOARD_COMPACT_INTERVAL`` seconds) folds day buckets older than
+``LEADERBOARD_BUCKET_RETENTION_DAYS`` into one row per calendar month.
+
+Cohort leaderboards (``cohort_members``) are the same boards restricted
+to a cohort's members. They are built on first use from this worker's
+global boards (each skill/period board only when first asked for), so a
+cold cohort costs one membership query and no score reads. They are kept
+up to date alongside the global boards and evicted least recently used
+beyond ``LEADERBOARD_COHORT_CACHE_SIZE`` cohorts. Empty cohorts are never
+kept, and non-members are turned away (:meth:`LeaderboardEngine.is_cohort_member`)
+before anything is loaded.
+
+Serialized pages are cached in :class:`PageCache` against
+``LeaderboardEngine.version``, which every change to a board bumps, so a
+page is rendered once per change however often it is polled. Cohort pages
+also carry their cohort's generation, which changes when the cohort is
+(re)loaded or gains members, so cohort churn never invalidates other pages.
+
+Workers apply their own writes immediately and pull everyone else's every
+``LEADERBOARD_SYNC_INTERVAL`` seconds by ``updated_at``. Rows carry absolute
+totals, so applying one twice or out of order is harmless and the next
+sync converges.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+from collections import Counter, OrderedDict
+from datetime import date, datetime, timedelta
+from math import inf
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import case, delete, func, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import AsyncSessionLocal, async_engine, write_transaction
+from app.models import CohortMember, LeaderboardBucket, LeaderboardScore, PracticeAttempt, User
+from app.ranking import RankIndex
+
+
+LEADERBOARD_SYNC_INTERVAL = float(os.getenv("LEADERBOARD_SYNC_INTERVAL", "5"))
+# Rows committed slightly out of updated_at order (or stamped by a worker
+# whose clock lags) are still picked up by re-reading this much history.
+LEADERBOARD_SYNC_OVERLAP = float(os.getenv("LEADERBOARD_SYNC_OVERLAP", "5"))
+LEADERBOARD_PAGE_CACHE_SIZE = max(1, int(os.getenv("LEADERBOARD_PAGE_CACHE_SIZE", "512")))
+LEADERBOARD_COHORT_CACHE_SIZE = max(1, int(os.getenv("LEADERBOARD_COHORT_CACHE_SIZE", "256")))
+LEADERBOARD_COMPACT_INTERVAL = float(os.getenv("LEADERBOARD_COMPACT_INTERVAL", "3600"))
+LOAD_BATCH_SIZE = 10000
+
+SKILLS: Tuple[str, ...] = ("listening", "speaking", "reading", "writing")
+OVERALL = "overall"
+BOARDS: Tuple[str, ...] = SKILLS + (OVERALL,)
+
+ALL_TIME = "all_time"
+# Rolling windows, in days, ending today (UTC).
+PERIOD_DAYS: Dict[str, int] = {"daily": 1, "weekly": 7, "monthly": 30}
+PERIODS: Tuple[str, ...] = tuple(PERIOD_DAYS) + (ALL_TIME,)
+WINDOW_DAYS = max(PERIOD_DAYS.values())
+
+DAY = "day"
+MONTH = "month"
+# Day buckets are kept a little longer than the widest window needs.
+LEADERBOARD_BUCKET_RETENTION_DAYS = max(
+    WINDOW_DAYS + 1, int(os.getenv("LEADERBOARD_BUCKET_RETENTION_DAYS", "35"))
+)
+COMPACT_BATCH_SIZE = 1000
+
+_insert = postgresql_insert if async_engine.dialect.name == "postgresql" else sqlite_insert
+
+
+class Board:
+    """
+    One ranking: user scores plus indexes ordered best first.
+
+    Ranks are dense: users with equal scores share a rank and the next
+    score down gets the next rank (100, 90, 90, 80 rank 1, 2, 2, 3). A
+    second index over the distinct scores makes that O(log n) too.
+    """
+
+    def __init__(self, scores: Optional[Dict[int, float]] = None):
+        self.scores: Dict[int, float] = {
+            user_id: score for user_id, score in (scores or {}).items() if score > 0
+        }
+        self.index = RankIndex([(-score, user_id) for user_id, score in self.scores.items()])
+        self.score_counts: Dict[float, int] = dict(Counter(self.scores.values()))
+        self.distinct = RankIndex(-score for score in self.score_counts)
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def get(self, user_id: int) -> float:
+        return self.scores.get(user_id, 0.0)
+
+    def set(self, user_id: int, score: float) -> bool:
+        """Set a user's score (returns True if it changed); users with no points are not ranked."""
+        old = self.scores.get(user_id)
+        if old == score or (old is None and score <= 0):
+            return False
+        if old is not None:
+            self.index.remove((-old, user_id))
+            del self.scores[user_id]
+            self.score_counts[old] -= 1
+            if not self.score_counts[old]:
+                del self.score_counts[old]
+                self.distinct.remove(-old)
+        if score > 0:
+            self.scores[user_id] = score
+            self.index.add((-score, user_id))
+            if score not in self.score_counts:
+                self.score_counts[score] = 0
+                self.distinct.add(-score)
+            self.score_counts[score] += 1
+        return True
+
+    def dense_rank(self, score: float) -> int:
+        """Rank of ``score``: 1 + the number of distinct higher scores."""
+        return self.distinct.index(-score) + 1
+
+    def position(self, user_id: int) -> Optional[int]:
+        """0-based position of the user in board order, or None if unranked."""
+        score = self.scores.get(user_id)
+        if score is None:
+            return None
+        return self.index.index((-score, user_id))
+
+    def count_above(self, score: float) -> int:
+        """Number of users with a strictly higher score."""
+        return self.index.index((-score, -inf))
+
+    def ranked(self, start: int, stop: int) -> List[Tuple[int, int, float]]:
+        """``(rank, user_id, score)`` for board positions ``start`` to ``stop``."""
+        rows: List[Tuple[int, int, float]] = []
+        rank, previous = 0, None
+        for negated, user_id in self.index.islice(start, stop):
+            score = -negated
+            if score != previous:
+                rank = self.dense_rank(score) if previous is None else rank + 1
+                previous = score
+            rows.append((rank, user_id, score))
+        return rows
+
+    def top(self, limit: int) -> List[Tuple[int, int, float]]:
+        """``(rank, user_id, score)`` of the best ``limit`` users."""
+        return self.ranked(0, limit)
+
+
+class CohortBoards:
+    """A cohort's members and its boards, each built on first use."""
+
+    def __init__(self, members: Set[int], generation: int):
+        self.members = members
+        # Part of the cohort's page-cache version; see LeaderboardEngine.cache_version.
+        self.generation = generation
+        self.boards: Dict[Tuple[str, str], Board] = {}
+
+    def board(self, period: str, name: str, source: Board) -> Board:
+        """The cohort's slice of ``source`` (the global board for period/name)."""
+        board = self.boards.get((period, name))
+        if board is None:
+            scores = source.scores
+            board = self.boards[(period, name)] = Board(
+                {user_id: scores[user_id] for user_id in self.members if user_id in scores}
+            )
+        return board
+
+    def set(self, period: str, name: str, user_id: int, score: float) -> None:
+        board = self.boards.get((period, name))
+        if board is not None:
+            board.set(user_id, score)
+
+
+def _utc_today() -> date:
+    return datetime.utcnow().date()
+
+
+def _upsert_bucket(
+    user_id: int, skill: str, day: date, points: float, now: datetime
+):
+    """Add ``points`` to a day bucket, returning its new score."""
+    table = LeaderboardBucket.__table__
+    return (
+        _insert(table)
+        .values(
+            user_id=user_id,
+            skill_type=skill,
+            granularity=DAY,
+            starts_on=day,
+            score=points,
+            attempts=1,
+            updated_at=now,
+        )
+        .on_conflict_do_update(
+            index_elements=[
+                table.c.user_id, table.c.skill_type, table.c.granularity, table.c.starts_on
+            ],
+            set_={
+                "score": table.c.score + points,
+                "attempts": table.c.attempts + 1,
+                "updated_at": now,
+            },
+        )
+        .returning(table.c.score)
+    )
+
+
+class LeaderboardEngine:
+    """In-memory boards for every skill and period, fed from the leaderboard tables."""
+
+    def __init__(self):
+        self.boards: Dict[str, Board] = {name: Board() for name in BOARDS}
+        self.windows: Dict[str, Dict[str, Board]] = {
+            period: {name: Board() for name in BOARDS} for period in PERIOD_DAYS
+        }
+        # day -> {(user_id, skill): points} for the days inside the widest window
+        self.buckets: Dict[date, Dict[Tuple[int, str], float]] = {}
+        self.names: Dict[int, str] = {}
+        # user_id -> (streak_days, last_active_on)
+        self.streaks: Dict[int, Tuple[int, Optional[date]]] = {}
+        # Loaded cohorts, least recently used first
+        self.cohorts: "OrderedDict[str, CohortBoards]" = OrderedDict()
+        # user_id -> loaded cohorts the user belongs to
+        self.user_cohorts: Dict[int, Set[str]] = {}
+        self.cohort_cache_size = LEADERBOARD_COHORT_CACHE_SIZE
+        # Never reused, so a cohort evicted and loaded again gets a new one.
+        self._cohort_generation = 0
+        self.loaded = False
+        self.today: Optional[date] = None
+        self._watermark: Optional[datetime] = None
+        self._bucket_watermark: Optional[datetime] = None
+        self._member_watermark: Optional[datetime] = None
+        # Bumped whenever anything a leaderboard page shows changes.
+        self.version = 0
+
+    def cache_version(self, cohort: Optional[str] = None) -> Tuple[int, date, int]:
+        """
+        Version of a page's content.
+
+        Includes the date because windows roll and streaks lapse at
+        midnight (UTC) without any write, and for cohort pages the cohort's
+        generation, since its membership changes without touching ``version``.
+        """
+        today = _utc_today()
+        self.roll(today)
+        loaded = self.cohorts.get(cohort) if cohort is not None else None
+        return self.version, today, loaded.generation if loaded is not None else 0
+
+    def _next_cohort_generation(self) -> int:
+        self._cohort_generation += 1
+        return self._cohort_generation
+
+    def _global(self, period: str) -> Dict[str, Board]:
+        return self.boards if period == ALL_TIME else self.windows[period]
+
+    def board(self, period: str = ALL_TIME, name: str = OVERALL, cohort: Optional[str] = None) -> Board:
+        """
+        The board for ``period`` and ``name``, restricted to ``cohort`` if given.
+
+        A cohort must have been loaded with :meth:`ensure_cohort` first;
+        cohorts with no members (which are never kept) get an empty board.
+        """
+        if period != ALL_TIME:
+            self.roll(_utc_today())
+        source = self._global(period)[name]
+        if cohort is None:
+            return source
+        loaded = self.cohorts.get(cohort)
+        if loaded is None:
+            return Board()
+        return loaded.board(period, name, source)
+
+    def _set_score(self, period: str, name: str, user_id: int, score: float) -> None:
+        """Set a score on a global board and on the user's loaded cohort boards."""
+        if self._global(period)[name].set(user_id, score):
+            self.version += 1
+        for cohort in self.user_cohorts.get(user_id, ()):
+            self.cohorts[cohort].set(period, name, user_id, score)
+
+    # -- loading and syncing ---------------------------------------------------
+
+    @staticmethod
+    def _rows_query():
+        return select(
+            LeaderboardScore.user_id,
+            LeaderboardScore.skill_type,
+            LeaderboardScore.score,
+            LeaderboardScore.streak_days,
+            LeaderboardScore.last_active_on,
+            LeaderboardScore.updated_at,
+            func.coalesce(User.username, User.full_name),
+        ).join(User, User.id == LeaderboardScore.user_id)
+
+    @staticmethod
+    def _buckets_query(today: date):
+        return select(
+            LeaderboardBucket.user_id,
+            LeaderboardBucket.skill_type,
+            LeaderboardBucket.starts_on,
+            LeaderboardBucket.score,
+            LeaderboardBucket.updated_at,
+        ).where(
+            LeaderboardBucket.granularity == DAY,
+            LeaderboardBucket.starts_on > today - timedelta(days=WINDOW_DAYS),
+        )
+
+    async def load(self) -> int:
+        """Rebuild every board from the tables; returns the number of rows read."""
+        today = _utc_today()
+        scores: Dict[str, Dict[int, float]] = {name: {} for name in BOARDS}
+        windows: Dict[str, Dict[str, Dict[int, float]]] = {
+            period: {name: {} for name in BOARDS} for period in PERIOD_DAYS
+        }
+        buckets: Dict[date, Dict[Tuple[int, str], float]] = {}
+        names: Dict[int, str] = {}
+        streaks: Dict[int, Tuple[int, Optional[date]]] = {}
+        watermark: Optional[datetime] = None
+        bucket_watermark: Optional[datetime] = None
+        count = 0
+        # The primary, not a replica: a lagging replica would lose updates
+        # older than the sync overlap.
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(
+                self._rows_query().execution_options(yield_per=LOAD_BATCH_SIZE)
+            )
+            async for rows in result.partitions():
+                for user_id, skill, score, streak, last_active, updated_at, name in rows:
+                    if skill not in scores:
+                        continue
+                    scores[skill][user_id] = round(score, 2)
+                    if skill == OVERALL:
+                        names[user_id] = name
+                        streaks[user_id] = (streak, last_active)
+                    if watermark is None or updated_at > watermark:
+                        watermark = updated_at
+                    count += 1
+
+            member_watermark = await db.scalar(select(func.max(CohortMember.created_at)))
+
+            result = await db.stream(
+                self._buckets_query(today).execution_options(yield_per=LOAD_BATCH_SIZE)
+            )
+            async for rows in result.partitions():
+                for user_id, skill, day, score, updated_at in rows:
+                    if skill not in scores or day > today:
+                        continue
+                    buckets.setdefault(day, {})[(user_id, skill)] = score
+                    age = (today - day).days
+                    for period, days in PERIOD_DAYS.items():
+                        if age < days:
+                            window = windows[period][skill]
+                            window[user_id] = window.get(user_id, 0.0) + score
+                    if bucket_watermark is None or updated_at > bucket_watermark:
+                        bucket_watermark = updated_at
+                    count += 1
+
+        self.boards = {name: Board(scores[name]) for name in BOARDS}
+        self.windows = {
+            period: {
+                name: Board({user_id: round(score, 2) for user_id, score in window.items()})
+                for name, window in boards.items()
+            }
+            for period, boards in windows.items()
+        }
+        self.buckets = buckets
+        self.today = today
+        self.names, self.streaks = names, streaks
+        self._watermark = watermark
+        self._bucket_watermark = bucket_watermark
+        self._member_watermark = member_watermark
+        for cohort, loaded in self.cohorts.items():
+            self.cohorts[cohort] = CohortBoards(loaded.members, self._next_cohort_generation())
+        self.version += 1
+        self.loaded = True
+        return count
+
+    async def ensure_loaded(self) -> None:
+        if not self.loaded:
+            await self.load()
+
+    async def sync(self) -> int:
+        """Apply rows changed since the last load/sync; returns how many."""
+        if not self.loaded:
+            return await self.load()
+        today = _utc_today()
+        self.roll(today)
+        query = self._rows_query()
+        if self._watermark is not None:
+            since = self._watermark - timedelta(seconds=LEADERBOARD_SYNC_OVERLAP)
+            query = query.where(LeaderboardScore.updated_at >= since)
+        bucket_query = self._buckets_query(today)
+        if self._bucket_watermark is not None:
+            since = self._bucket_watermark - timedelta(seconds=LEADERBOARD_SYNC_OVERLAP)
+            bucket_query = bucket_query.where(LeaderboardBucket.updated_at >= since)
+        member_query = select(CohortMember.cohort, CohortMember.user_id, CohortMember.created_at)
+        if self._member_watermark is not None:
+            since = self._member_watermark - timedelta(seconds=LEADERBOARD_SYNC_OVERLAP)
+            member_query = member_query.where(CohortMember.created_at >= since)
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(query)).all()
+            bucket_rows = (await db.execute(bucket_query)).all()
+            member_rows = (await db.execute(member_query)).all()
+        for user_id, skill, score, streak, last_active, updated_at, name in rows:
+            self._apply(user_id, skill, score, name, streak, last_active)
+            if self._watermark is None or updated_at > self._watermark:
+                self._watermark = updated_at
+        for user_id, skill, day, score, updated_at in bucket_rows:
+            self._apply_bucket(user_id, skill, day, score)
+            if self._bucket_watermark is None or updated_at > self._bucket_watermark:
+                self._bucket_watermark = updated_at
+        for cohort, user_id, created_at in member_rows:
+            self.members_added(cohort, [user_id])
+            if self._member_watermark is None or created_at > self._member_watermark:
+                self._member_watermark = created_at
+        return len(rows) + len(bucket_rows) + len(member_rows)
+
+    async def run_sync(self, interval: float = LEADERBOARD_SYNC_INTERVAL) -> None:
+        """Background loop for the lifespan hook; cancel it on shutdown."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.sync()
+            except Exception as e:
+                print(f"⚠️  Leaderboard sync failed: {e}")
+
+    def _apply(
+        self,
+        user_id: int,
+        skill: str,
+        score: float,
+        name: str,
+        streak: int = 0,
+        last_active: Optional[date] = None,
+    ) -> None:
+        if skill not in self.boards:
+            return
+        self._set_score(ALL_TIME, skill, user_id, round(score, 2))
+        if skill == OVERALL:
+            if self.names.get(user_id) != name or self.streaks.get(user_id) != (streak, last_active):
+                self.version += 1
+            self.names[user_id] = name
+            self.streaks[user_id] = (streak, last_active)
+
+    def _apply_bucket(self, user_id: int, skill: str, day: date, score: float) -> None:
+        """Set a day bucket's total and move the windows containing it by the difference."""
+        if skill not in self.boards:
+            return
+        self.roll(day)
+        age = (self.today - day).days
+        if not 0 <= age < WINDOW_DAYS:
+            return
+        bucket = self.buckets.setdefault(day, {})
+        delta = score - bucket.get((user_id, skill), 0.0)
+        if not delta:
+            return
+        bucket[(user_id, skill)] = score
+        for period, days in PERIOD_DAYS.items():
+            if age < days:
+                current = self.windows[period][skill].get(user_id)
+                self._set_score(period, skill, user_id, round(current + delta, 2))
+
+    def roll(self, today: date) -> None:
+        """
+        Advance the windows to ``today``.
+
+        For each day that passes, the bucket that falls out of each window
+        is subtracted from it; buckets older than every window are dropped.
+        """
+        if self.today is None:
+            self.today = today
+            return
+        while self.today < today:
+            self.today += timedelta(days=1)
+            for period, days in PERIOD_DAYS.items():
+                expired = self.buckets.get(self.today - timedelta(days=days))
+                if not expired:
+                    continue
+                boards = self.windows[period]
+                for (user_id, skill), score in expired.items():
+                    current = boards[skill].get(user_id)
+                    self._set_score(period, skill, user_id, round(current - score, 2))
+            self.buckets.pop(self.today - timedelta(days=WINDOW_DAYS), None)
+
+    # -- cohorts -----------------------------------------------------------------
+
+    async def is_cohort_member(self, cohort: str, user_id: int) -> bool:
+        """
+        Whether ``user_id`` belongs to ``cohort``, without loading the cohort.
+
+        Answered from memory when the cohort is loaded and lists the user,
+        otherwise by a primary-key lookup of one ``cohort_members`` row.
+        """
+        loaded = self.cohorts.get(cohort)
+        if loaded is not None and user_id in loaded.members:
+            return True
+        async with AsyncSessionLocal() as db:
+            found = await db.scalar(
+                select(CohortMember.user_id).where(
+                    CohortMember.cohort == cohort, CohortMember.user_id == user_id
+                )
+            )
+        return found is not None
+
+    async def ensure_cohort(self, cohort: str) -> Set[int]:
+        """
+        Load a cohort if needed and mark it recently used; returns its members.
+
+        Cohorts without members are not kept, so unknown names cannot fill
+        the cache and evict real cohorts.
+        """
+        await self.ensure_loaded()
+        loaded = self.cohorts.get(cohort)
+        if loaded is not None:
+            self.cohorts.move_to_end(cohort)
+            return loaded.members
+        async with AsyncSessionLocal() as db:
+            members = set(
+                (await db.scalars(select(CohortMember.user_id).where(CohortMember.cohort == cohort))).all()
+            )
+        if cohort in self.cohorts:  # loaded by a concurrent request meanwhile
+            return self.cohorts[cohort].members
+        if not members:
+            return members
+        # A new generation: membership may have changed while it was not loaded.
+        self.cohorts[cohort] = CohortBoards(members, self._next_cohort_generation())
+        for user_id in members:
+            self.user_cohorts.setdefault(user_id, set()).add(cohort)
+        while len(self.cohorts) > self.cohort_cache_size:
+            self._evict_cohort(next(iter(self.cohorts)))
+        return members
+
+    def _evict_cohort(self, cohort: str) -> None:
+        for user_id in self.cohorts.pop(cohort).members:
+            cohorts = self.user_cohorts.get(user_id)
+            if cohorts is not None:
+                cohorts.discard(cohort)
+                if not cohorts:
+                    del self.user_cohorts[user_id]
+
+    def members_added(self, cohort: str, user_ids: Iterable[int]) -> None:
+        """Add committed members to the cohort's boards if it is loaded here."""
+        loaded = self.cohorts.get(cohort)
+        if loaded is None:
+            return
+        for user_id in user_ids:
+            if user_id in loaded.members:
+                continue
+            loaded.members.add(user_id)
+            self.user_cohorts.setdefault(user_id, set()).add(cohort)
+            loaded.generation = self._next_cohort_generation()
+            for period, name in loaded.boards:
+                loaded.set(period, name, user_id, self._global(period)[name].get(user_id))
+
+    async def add_cohort_members(
+        self, db: AsyncSession, cohort: str, user_ids: Iterable[int]
+    ) -> None:
+        """Add users to a cohort; existing members are left as they are."""
+        table = CohortMember.__table__
+        user_ids = list(user_ids)
+        now = datetime.utcnow()
+        async with write_transaction(db):
+            await db.execute(
+                _insert(table)
+                .values([{"cohort": cohort, "user_id": u, "created_at": now} for u in user_ids])
+                .on_conflict_do_nothing(index_elements=[table.c.cohort, table.c.user_id])
+            )
+        self.members_added(cohort, user_ids)
+
+    # -- writes ------------------------------------------------------------------
+
+    async def record_attempt(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        name: str,
+        skill: str,
+        points: float,
+        now: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        """
+        Store a scored attempt and add its points to the user's totals.
+
+        The skill and overall rows (and today's buckets for both) are bumped
+        with ``INSERT ... ON CONFLICT DO UPDATE ... RETURNING`` in the same
+        transaction as the attempt, so concurrent attempts never lose
+        points, and the returned totals are applied to this worker's boards
+        once committed.
+        """
+        if skill not in SKILLS:
+            raise ValueError(f"Unknown skill type: {skill}")
+        now = now or datetime.utcnow()
+        today = now.date()
+        table = LeaderboardScore.__table__
+        totals: Dict[str, Tuple[float, int]] = {}
+        day_scores: Dict[str, float] = {}
+        async with write_transaction(db):
+            db.add(PracticeAttempt(user_id=user_id, skill_type=skill, score=points, created_at=now))
+            for row_skill in (skill, OVERALL):
+                streak = 1 if row_skill == OVERALL else 0
+                insert = _insert(table).values(
+                    user_id=user_id,
+                    skill_type=row_skill,
+                    score=points,
+                    attempts=1,
+                    streak_days=streak,
+                    last_active_on=today,
+                    updated_at=now,
+                )
+                updates: Dict[str, Any] = {
+                    "score": table.c.score + points,
+                    "attempts": table.c.attempts + 1,
+                    "last_active_on": today,
+                    "updated_at": now,
+                }
+                if row_skill == OVERALL:
+                    updates["streak_days"] = case(
+                        (table.c.last_active_on == today, table.c.streak_days),
+                        (table.c.last_active_on == today - timedelta(days=1), table.c.streak_days + 1),
+                        else_=1,
+                    )
+                result = await db.execute(
+                    insert.on_conflict_do_update(
+                        index_elements=[table.c.user_id, table.c.skill_type], set_=updates
+                    ).returning(table.c.score, table.c.streak_days)
+                )
+                totals[row_skill] = tuple(result.one())
+                result = await db.execute(_upsert_bucket(user_id, row_skill, today, points, now))
+                day_scores[row_skill] = result.scalar_one()
+
+        skill_score, _ = totals[skill]
+        total_score, streak_days = totals[OVERALL]
+        self._apply(user_id, skill, skill_score, name)
+        self._apply(user_id, OVERALL, total_score, name, streak_days, today)
+        for row_skill, day_score in day_scores.items():
+            self._apply_bucket(user_id, row_skill, today, day_score)
+        return {
+            "skill_type": skill,
+            "score": points,
+            "skill_score": round(skill_score, 2),
+            "total_score": round(total_score, 2),
+            "streak_days": streak_days,
+        }
+
+    # -- reads ---------------------------------------------------------------------
+
+    def streak(self, user_id: int, today: Optional[date] = None) -> int:
+        """Current streak; it lapses once a whole day passes without practice."""
+        streak, last_active = self.streaks.get(user_id, (0, None))
+        if last_active is None:
+            return 0
+        today = today or _utc_today()
+        return streak if (today - last_active).days <= 1 else 0
+
+    def entry(
+        self, rank: int, user_id: int, score: float, boards: Optional[Dict[str, Board]] = None
+    ) -> Dict[str, Any]:
+        boards = boards or self.boards
+        return {
+            "rank": rank,
+            "user_id": user_id,
+            "username": self.names.get(user_id, ""),
+            "total_score": score,
+            "skill_scores": {skill: boards[skill].get(user_id) for skill in SKILLS},
+            "streak_days": self.streak(user_id),
+            "avatar_url": None,
+        }
+
+    def top(
+        self,
+        skill: Optional[str] = None,
+        limit: int = 100,
+        period: str = ALL_TIME,
+        cohort: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        The best ``limit`` users overall, or for one skill, over ``period``,
+        optionally among a (loaded) cohort's members.
+
+        ``total_score`` is the score the board is ranked by and
+        ``skill_scores`` cover the same period; ranks are dense and tied
+        users are listed by user id.
+        """
+        board = self.board(period, skill or OVERALL, cohort)
+        boards = self._global(period)
+        return [
+            self.entry(rank, user_id, score, boards)
+            for rank, user_id, score in board.top(limit)
+        ]
+
+    def rank(
+        self,
+        user_id: int,
+        skill: Optional[str] = None,
+        neighbors: int = 0,
+        period: str = ALL_TIME,
+        cohort: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        A user's dense rank, percentile and the ``neighbors`` users listed
+        directly above and below them, or None if they have no points.
+
+        ``percentile`` is the share of ranked users scoring at or below the
+        user (100 for the leader).
+        """
+        board = self.board(period, skill or OVERALL, cohort)
+        boards = self._global(period)
+        position = board.position(user_id)
+        if position is None:
+            return None
+        score = board.scores[user_id]
+        ranked = len(board)
+        return {
+            "user_id": user_id,
+            "skill_type": skill,
+            "period": period,
+            "cohort": cohort,
+            "rank": board.dense_rank(score),
+            "total_score": score,
+            "percentile": round(100.0 * (ranked - board.count_above(score)) / ranked, 2),
+            "ranked_users": ranked,
+            "neighbors": [
+                self.entry(rank, neighbor_id, neighbor_score, boards)
+                for rank, neighbor_id, neighbor_score in board.ranked(
+                    max(0, position - neighbors), position + neighbors + 1
+                )
+            ],
+        }
+
+
+async def compact_buckets(
+    today: Optional[date] = None,
+    retention_days: int = LEADERBOARD_BUCKET_RETENTION_DAYS,
+) -> int:
+    """
+    Fold day buckets older than ``retention_days`` into month buckets.
+
+    Works one day at a time: the day's rows are deleted with ``RETURNING``
+    and their points added to the month rows in the same transaction, so
+    two workers compacting at once cannot count a day twice. Returns the
+    number of day buckets folded.
+    """
+    today = today or _utc_today()
+    cutoff = today - timedelta(days=max(retention_days, WINDOW_DAYS + 1))
+    table = LeaderboardBucket.__table__
+    now = datetime.utcnow()
+    compacted = 0
+    async with AsyncSessionLocal() as db:
+        while True:
+            async with write_transaction(db):
+                oldest = await db.scalar(
+                    select(func.min(table.c.starts_on)).where(
+                        table.c.granularity == DAY, table.c.starts_on < cutoff
+                    )
+                )
+                if oldest is None:
+                    break
+                rows = (
+                    await db.execute(
+                        delete(table)
+                        .where(table.c.granularity == DAY, table.c.starts_on == oldest)
+                        .returning(table.c.user_id, table.c.skill_type, table.c.score, table.c.attempts)
+                    )
+                ).all()
+                month = oldest.replace(day=1)
+                for start in range(0, len(rows), COMPACT_BATCH_SIZE):
+                    insert = _insert(table).values(
+                        [
+                            {
+                                "user_id": user_id,
+                                "skill_type": skill,
+                                "granularity": MONTH,
+                                "starts_on": month,
+                                "score": score,
+                                "attempts": attempts,
+                                "updated_at": now,
+                            }
+                            for user_id, skill, score, attempts in rows[start:start + COMPACT_BATCH_SIZE]
+                        ]
+                    )
+                    await db.execute(
+                        insert.on_conflict_do_update(
+                            index_elements=[
+                                table.c.user_id,
+                                table.c.skill_type,
+                                table.c.granularity,
+                                table.c.starts_on,
+                            ],
+                            set_={
+                                "score": table.c.score + insert.excluded.score,
+                                "attempts": table.c.attempts + insert.excluded.attempts,
+                                "updated_at": now,
+                            },
+                        )
+                    )
+            compacted += len(rows)
+    return compacted
+
+
+async def run_compaction(interval: float = LEADERBOARD_COMPACT_INTERVAL) -> None:
+    """Background loop for the lifespan hook; cancel it on shutdown."""
+    while True:
+        try:
+            compacted = await compact_buckets()
+            if compacted:
+                print(f"🗜️  Compacted {compacted} leaderboard day buckets")
+        except Exception as e:
+            print(f"⚠️  Leaderboard compaction failed: {e}")
+        await asyncio.sleep(interval)
+
+
+class PageCache:
+    """
+    Serialized leaderboard pages, valid for one engine version.
+
+    Entries are JSON bytes plus an ETag derived from their content (so
+    ETags agree across workers whose version counters differ), evicted
+    least recently used beyond ``max_entries``.
+    """
+
+    def __init__(self, max_entries: int = LEADERBOARD_PAGE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[Any, ...], Tuple[Any, bytes, str]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Tuple[Any, ...], version: Any) -> Optional[Tuple[bytes, str]]:
+        """``(body, etag)`` cached for ``key`` at ``version``, or None."""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version:
+            return None
+        self._entries.move_to_end(key)
+        return entry[1], entry[2]
+
+    def put(self, key: Tuple[Any, ...], version: Any, payload: Any) -> Tuple[bytes, str]:
+        """Serialize ``payload`` and cache it for ``key`` at ``version``."""
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        etag = f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+        self._entries[key] = (version, body, etag)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return body, etag
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+leaderboard_engine = LeaderboardEngine()
+leaderboard_pages = PageCache()
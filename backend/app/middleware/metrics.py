@@ -0,0 +1,85 @@
+"""
+Request timing middleware.
+
+Records every HTTP request in the latency histograms of :mod:`app.metrics`
+and, when enabled, adds a ``Server-Timing`` header listing the time spent
+in the database, bcrypt and the rest of the app, so slow requests can be
+diagnosed straight from the browser's network panel.
+
+The header is never added under ``/api/auth``: there, how long bcrypt took
+(or whether it ran at all) tells a caller whether an account exists.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Sequence
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.metrics import (
+    REQUEST_DB_QUERIES,
+    REQUEST_DB_SECONDS,
+    REQUEST_DURATION,
+    end_request,
+    start_request,
+)
+
+
+def _route_label(scope: Scope) -> str:
+    """Route template (``/api/users/{user_id}``), never the raw path."""
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path:
+        return path
+    # Mounted apps (static files) have no route object; label by mount.
+    root_path = scope.get("root_path", "")
+    return f"{root_path}/*" if root_path else "<unmatched>"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware; adds one context variable and a send wrapper."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        server_timing: bool = False,
+        server_timing_excluded: Sequence[str] = ("/api/auth",),
+    ):
+        self.app = app
+        self.server_timing = server_timing
+        self.server_timing_excluded = tuple(server_timing_excluded)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        timings, token = start_request()
+        status_code = 500
+        server_timing = self.server_timing and not scope["path"].startswith(
+            self.server_timing_excluded
+        )
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if server_timing:
+                    value = timings.server_timing(time.perf_counter() - started)
+                    message["headers"] = list(message.get("headers", ())) + [
+                        (b"server-timing", value.encode("latin-1"))
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            end_request(token)
+            route = _route_label(scope)
+            REQUEST_DURATION.observe(
+                time.perf_counter() - started, scope["method"], route, str(status_code)
+            )
+            REQUEST_DB_QUERIES.observe(timings.count("db"), route)
+            REQUEST_DB_SECONDS.observe(timings.seconds("db"), route)
@@ -0,0 +1,65 @@
+"""
+Per-request sampling profiler middleware.
+
+Enabled with ``TUNEENG_PROFILE_REQUESTS`` (a fraction such as ``0.01``).
+For a sampled request a :class:`~app.profiling.StackSampler` watches the
+event-loop thread until the response is sent, and the collapsed stacks are
+written to ``TUNEENG_PROFILE_DIR``. Other requests running concurrently on
+the same loop show up in the profile too, so read it alongside the
+request's own duration in the file name.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+import time
+from typing import Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.profiling import (
+    PROFILE_REQUESTS_FRACTION,
+    RequestProfileStore,
+    StackSampler,
+)
+
+
+class RequestProfilingMiddleware:
+    """Pure ASGI middleware; unsampled requests cost one ``random()`` call."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        fraction: float = PROFILE_REQUESTS_FRACTION,
+        store: Optional[RequestProfileStore] = None,
+    ):
+        self.app = app
+        self.fraction = fraction
+        self.store = store if store is not None else RequestProfileStore()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or random.random() >= self.fraction:
+            await self.app(scope, receive, send)
+            return
+
+        sampler = StackSampler(thread_ids=[threading.get_ident()]).start()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            # stop() joins the sampler thread, which may be mid-pass over
+            # every thread's frames; don't block the loop on it.
+            await asyncio.to_thread(sampler.stop)
+            if sampler.stacks:
+                try:
+                    await asyncio.to_thread(
+                        self.store.save,
+                        scope["method"],
+                        scope["path"],
+                        time.perf_counter() - started,
+                        sampler,
+                    )
+                except OSError as e:
+                    print(f"⚠️  Failed to write request profile: {e}")
@@ -3,153 +3,346 @@ Rate limiting middleware for FastAPI.
 Prevents brute-force attacks and abuse.
 """
 
-from collections import defaultdict
-from datetime import datetime, timedelta
-from typing import Dict, Tuple
-from fastapi import Request, HTTPException, status
-from starlette.middleware.base import BaseHTTPMiddleware
+import asyncio
+import json
+import math
+import os
+import time
+from dataclasses import dataclass
+from typing import Callable, FrozenSet, Optional, Sequence, Tuple
+from fastapi import status
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.middleware.rate_limit_backends import (
+    MemoryBackend,
+    RateLimitBackend,
+    create_backend_from_env,
+)
+from app.security import decode_access_token
 
 
 class RateLimiter:
-    """Simple in-memory rate limiter for development/testing."""
+    """
+    Sliding-window-counter rate limiter over a pluggable counter backend.
+
+    The backend atomically counts each hit in a fixed window and returns the
+    counts of that window and the previous one; the number of requests in
+    the trailing window is estimated as ``previous * overlap + current``.
+    That is O(1) state per key, and with a shared backend (SQLite, Redis)
+    the limit holds across all workers and survives restarts.
+
+    Windows are aligned to the monotonic clock for the in-memory backend
+    and to wall-clock time for shared backends, whose workers must agree on
+    window boundaries. Every attempt is counted, including rejected ones,
+    so a client hammering a limited endpoint stays limited.
+    """
     
-    def __init__(self):
-        self.requests: Dict[str, list] = defaultdict(list)
-        self.cleanup_interval = timedelta(minutes=5)
-        self.last_cleanup = datetime.now()
+    def __init__(
+        self,
+        backend: Optional[RateLimitBackend] = None,
+        clock: Optional[Callable[[], float]] = None,
+    ):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self._clock = clock or (time.time if self.backend.shared else time.monotonic)
+        self.backend_errors = 0
     
-    def is_allowed(self, key: str, max_requests: int, window_seconds: int) -> Tuple[bool, int]:
+    async def hit(self, key: str, max_requests: int, window_seconds: int) -> Tuple[bool, int]:
         """
-        Check if request is allowed.
-        
+        Record a request for ``key`` and decide whether it is allowed.
+
         Returns:
             (is_allowed, remaining_requests)
         """
-        now = datetime.now()
-        
-        # Cleanup old entries periodically
-        if now - self.last_cleanup > self.cleanup_interval:
-            self._cleanup(now)
-            self.last_cleanup = now
-        
-        # Get requests in the time window
-        window_start = now - timedelta(seconds=window_seconds)
-        recent_requests = [
-            req_time for req_time in self.requests[key]
-            if req_time > window_start
-        ]
-        
-        # Update stored requests
-        self.requests[key] = recent_requests
-        
-        # Check if limit exceeded
-        if len(recent_requests) >= max_requests:
-            return False, 0
-        
-        return True, max_requests - len(recent_requests)
-    
-    def _cleanup(self, now: datetime):
-        """Remove old entries to prevent memory leak."""
-        cutoff = now - timedelta(hours=1)
-        keys_to_remove = []
-        
-        for key, requests in self.requests.items():
-            self.requests[key] = [r for r in requests if r > cutoff]
-            if not self.requests[key]:
-                keys_to_remove.append(key)
-        
-        for key in keys_to_remove:
-            del self.requests[key]
+        is_allowed, remaining, _ = await self.hit_with_reset(key, max_requests, window_seconds)
+        return is_allowed, remaining
+
+    async def hit_with_reset(
+        self, key: str, max_requests: int, window_seconds: int
+    ) -> Tuple[bool, int, int]:
+        """
+        Like :meth:`hit`, also returning whole seconds until the quota resets.
+
+        When the budget is used up that is the time until the sliding
+        estimate has decayed enough for one more request, so a client that
+        waits that long is let through. Otherwise it is the window length.
+
+        If the backend is unreachable the request is allowed (fail open), so
+        a cache outage never takes authentication down with it.
+
+        Returns:
+            (is_allowed, remaining_requests, reset_seconds)
+        """
+        now = self._clock()
+        index = int(now // window_seconds)
+        try:
+            previous, current = await self.backend.increment(key, index, window_seconds)
+        except Exception as e:
+            self.backend_errors += 1
+            if self.backend_errors == 1 or self.backend_errors % 100 == 0:
+                print(f"⚠️  Rate limit backend error ({self.backend_errors} so far): {e}")
+            return True, max_requests, window_seconds
+
+        elapsed = (now - index * window_seconds) / window_seconds
+        overlap = 1.0 - elapsed
+        # Requests already in the trailing window before this one.
+        estimated = previous * overlap + current - 1
+        if estimated >= max_requests:
+            is_allowed, remaining = False, 0
+        else:
+            is_allowed, remaining = True, max(0, int(max_requests - estimated - 1))
+        if remaining:
+            return is_allowed, remaining, window_seconds
+        return is_allowed, remaining, self._retry_after(
+            previous, current, elapsed, max_requests, window_seconds
+        )
+
+    @staticmethod
+    def _retry_after(
+        previous: int, current: int, elapsed: float, max_requests: int, window_seconds: int
+    ) -> int:
+        """
+        Whole seconds until ``previous * overlap + current`` drops below the limit.
+
+        ``elapsed`` is how far into the current window we are (0..1). While
+        the current window alone is under the limit that happens in this
+        window, as the previous one decays; otherwise the current window's
+        count has to decay in the next one.
+        """
+        if current < max_requests:
+            if previous == 0:
+                return 1
+            wait = 1.0 - (max_requests - current) / previous - elapsed
+        else:
+            wait = 2.0 - max_requests / current - elapsed
+        # Strictly past the boundary, where the estimate still equals the
+        # limit (the epsilon absorbs float error when it is a whole second).
+        return math.floor(max(0.0, wait) * window_seconds + 1e-6) + 1
+
+    async def evict_expired(self) -> int:
+        """Drop counters whose windows have expired."""
+        return await self.backend.evict_expired(self._clock())
+
+    async def run_eviction(self, interval_seconds: float = 60.0) -> None:
+        """Background loop for the lifespan hook; cancel it on shutdown."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await self.evict_expired()
+            except Exception as e:
+                print(f"⚠️  Rate limit eviction failed: {e}")
+
+    async def clear(self) -> None:
+        """Forget all counters (used by tests)."""
+        await self.backend.clear()
 
 
 # Global rate limiter instance
-rate_limiter = RateLimiter()
+rate_limiter = RateLimiter(create_backend_from_env())
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """
+    One entry of the rate-limit table.
+
+    Attributes:
+        prefix: Request paths starting with this string are limited.
+        limit: Requests allowed per window.
+        window_seconds: Window length.
+        methods: HTTP methods the rule applies to (``None`` = all).
+        key: ``"ip"`` for a budget per client IP, ``"user"`` for a budget per
+            authenticated user (anonymous requests fall back to their IP).
+        detail: Message returned with the 429 response.
+    """
+
+    prefix: str
+    limit: int
+    window_seconds: int
+    methods: Optional[FrozenSet[str]] = None
+    key: str = "ip"
+    detail: str = "Too many requests. Please try again later."
+
+    def __post_init__(self):
+        if self.key not in ("ip", "user"):
+            raise ValueError(f"Unknown rate limit key {self.key!r} for {self.prefix}")
+        if self.limit < 1 or self.window_seconds < 1:
+            raise ValueError(f"Rate limit for {self.prefix} must be positive")
+
+    @property
+    def policy(self) -> str:
+        """Value for the ``RateLimit-Policy`` header, e.g. ``5;w=900``."""
+        return f"{self.limit};w={self.window_seconds}"
 
 
-def get_client_ip(request: Request) -> str:
-    """Extract client IP address from request."""
-    # Check for forwarded IP (if behind proxy)
-    forwarded = request.headers.get("X-Forwarded-For")
+# Matches the previous hardcoded behaviour: 5 attempts per 15 minutes per IP.
+# Admin bulk registration shares the register prefix, so it gets its own
+# (longer-prefix) per-user budget instead of the anonymous signup one.
+DEFAULT_RATE_LIMIT_RULES: Tuple[RateLimitRule, ...] = (
+    RateLimitRule(
+        prefix="/api/auth/login",
+        limit=5,
+        window_seconds=900,
+        detail="Too many authentication attempts. Please try again in 15 minutes.",
+    ),
+    RateLimitRule(
+        prefix="/api/auth/register",
+        limit=5,
+        window_seconds=900,
+        detail="Too many authentication attempts. Please try again in 15 minutes.",
+    ),
+    RateLimitRule(
+        prefix="/api/auth/register/bulk",
+        limit=60,
+        window_seconds=900,
+        key="user",
+        detail="Too many bulk registrations. Please try again later.",
+    ),
+)
+
+
+def load_rules_from_env() -> Tuple[RateLimitRule, ...]:
+    """
+    Read the rule table from ``RATE_LIMIT_RULES`` (a JSON list), e.g.::
+
+        [{"prefix": "/api/auth/login", "methods": ["POST"], "limit": 5, "window": 900},
+         {"prefix": "/api/practice/feedback", "limit": 30, "window": 60, "key": "user"}]
+
+    Falls back to :data:`DEFAULT_RATE_LIMIT_RULES` when unset.
+    """
+    raw = os.getenv("RATE_LIMIT_RULES", "").strip()
+    if not raw:
+        return DEFAULT_RATE_LIMIT_RULES
+    rules = []
+    for entry in json.loads(raw):
+        methods = entry.get("methods")
+        extra = {"detail": entry["detail"]} if "detail" in entry else {}
+        rules.append(
+            RateLimitRule(
+                prefix=entry["prefix"],
+                limit=int(entry["limit"]),
+                window_seconds=int(entry.get("window", entry.get("window_seconds", 60))),
+                methods=frozenset(m.upper() for m in methods) if methods else None,
+                key=entry.get("key", "ip"),
+                **extra,
+            )
+        )
+    return tuple(rules)
+
+
+class RateLimitTable:
+    """
+    Rules compiled for fast matching.
+
+    ``prefixes`` is a plain tuple so the common case - a path no rule
+    covers - is a single ``str.startswith`` call. Rules are tried longest
+    prefix first, so a specific rule overrides a broader one.
+    """
+
+    def __init__(self, rules: Sequence[RateLimitRule]):
+        self.rules = tuple(sorted(rules, key=lambda rule: len(rule.prefix), reverse=True))
+        self.prefixes = tuple(rule.prefix for rule in self.rules)
+
+    def match(self, method: str, path: str) -> Optional[RateLimitRule]:
+        for rule in self.rules:
+            if path.startswith(rule.prefix) and (
+                rule.methods is None or method in rule.methods
+            ):
+                return rule
+        return None
+
+
+def _scope_header(scope: Scope, name: bytes) -> Optional[str]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _scope_client_ip(scope: Scope) -> str:
+    """Client IP: ``X-Forwarded-For``, then ``X-Real-IP``, then the peer address."""
+    forwarded = _scope_header(scope, b"x-forwarded-for")
     if forwarded:
         return forwarded.split(",")[0].strip()
-    
-    # Check for real IP header
-    real_ip = request.headers.get("X-Real-IP")
+    real_ip = _scope_header(scope, b"x-real-ip")
     if real_ip:
         return real_ip
-    
-    # Fallback to direct client IP
-    if request.client:
-        return request.client.host
-    
-    return "unknown"
+    client = scope.get("client")
+    return client[0] if client else "unknown"
 
 
-def rate_limit(max_requests: int = 5, window_seconds: int = 900):
+def _scope_user_id(scope: Scope) -> Optional[str]:
+    authorization = _scope_header(scope, b"authorization")
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    try:
+        subject = decode_access_token(authorization[7:].strip()).get("sub")
+    except Exception:
+        return None
+    return str(subject) if subject is not None else None
+
+
+class RateLimitMiddleware:
     """
-    Rate limit decorator for endpoints.
-    
-    Args:
-        max_requests: Maximum number of requests allowed
-        window_seconds: Time window in seconds (default 15 minutes)
+    Pure ASGI rate-limiting middleware driven by a :class:`RateLimitTable`.
+
+    Requests whose path matches no rule are handed straight to the app with
+    no wrapping. Limited requests get the standard ``RateLimit-Limit``,
+    ``RateLimit-Remaining``, ``RateLimit-Reset`` and ``RateLimit-Policy``
+    headers; rejected ones are answered with 429 and ``Retry-After``.
     """
-    async def rate_limit_middleware(request: Request, call_next):
-        # Only apply rate limiting to auth endpoints
-        if request.url.path.startswith("/api/auth/login") or request.url.path.startswith("/api/auth/register"):
-            client_ip = get_client_ip(request)
-            endpoint = request.url.path
-            
-            # Create unique key for this IP + endpoint
-            key = f"{client_ip}:{endpoint}"
-            
-            is_allowed, remaining = rate_limiter.is_allowed(key, max_requests, window_seconds)
-            
-            if not is_allowed:
-                raise HTTPException(
-                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                    detail=f"Too many requests. Please try again later. Limit: {max_requests} requests per {window_seconds // 60} minutes.",
-                    headers={"Retry-After": str(window_seconds)},
-                )
-            
-            # Add remaining count to response headers
-            response = await call_next(request)
-            response.headers["X-RateLimit-Limit"] = str(max_requests)
-            response.headers["X-RateLimit-Remaining"] = str(remaining)
-            response.headers["X-RateLimit-Reset"] = str(int((datetime.now() + timedelta(seconds=window_seconds)).timestamp()))
-            return response
-        
-        return await call_next(request)
-    
-    return rate_limit_middleware
 
+    def __init__(
+        self,
+        app: ASGIApp,
+        rules: Optional[Sequence[RateLimitRule]] = None,
+        limiter: Optional[RateLimiter] = None,
+    ):
+        self.app = app
+        self.table = RateLimitTable(rules if rules is not None else load_rules_from_env())
+        self.limiter = limiter if limiter is not None else rate_limiter
+        self._prefixes = self.table.prefixes
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """FastAPI middleware for rate limiting."""
-    
-    async def dispatch(self, request: Request, call_next):
-        # Apply rate limiting to auth endpoints
-        if request.url.path.startswith("/api/auth/login") or request.url.path.startswith("/api/auth/register"):
-            client_ip = get_client_ip(request)
-            endpoint = request.url.path
-            key = f"{client_ip}:{endpoint}"
-            
-            # 5 requests per 15 minutes for auth endpoints
-            is_allowed, remaining = rate_limiter.is_allowed(key, max_requests=5, window_seconds=900)
-            
-            if not is_allowed:
-                from fastapi.responses import JSONResponse
-                return JSONResponse(
-                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                    content={
-                        "detail": "Too many authentication attempts. Please try again in 15 minutes."
-                    },
-                    headers={"Retry-After": "900"},
-                )
-            
-            response = await call_next(request)
-            response.headers["X-RateLimit-Limit"] = "5"
-            response.headers["X-RateLimit-Remaining"] = str(remaining)
-            return response
-        
-        return await call_next(request)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self._prefixes):
+            await self.app(scope, receive, send)
+            return
+        rule = self.table.match(scope["method"], scope["path"])
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        identity = None
+        if rule.key == "user":
+            user_id = _scope_user_id(scope)
+            identity = f"user:{user_id}" if user_id else None
+        if identity is None:
+            identity = f"ip:{_scope_client_ip(scope)}"
+        key = f"{identity}:{rule.prefix}"
+
+        is_allowed, remaining, reset = await self.limiter.hit_with_reset(
+            key, rule.limit, rule.window_seconds
+        )
+        headers = [
+            (b"ratelimit-limit", str(rule.limit).encode()),
+            (b"ratelimit-remaining", str(remaining).encode()),
+            (b"ratelimit-reset", str(reset).encode()),
+            (b"ratelimit-policy", rule.policy.encode()),
+        ]
+
+        if not is_allowed:
+            response = JSONResponse(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                content={"detail": rule.detail},
+                headers={"Retry-After": str(reset)},
+            )
+            response.raw_headers.extend(headers)
+            await response(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", ())) + headers
+            await send(message)
 
+        await self.app(scope, receive, send_with_headers)
@@ -0,0 +1,395 @@
+"""
+Counter storage backends for the rate limiter.
+
+Every backend implements the same primitive: atomically count one hit in a
+fixed window and report the counts of that window and the one before it.
+``RateLimiter`` turns those two numbers into a sliding-window estimate.
+
+- ``MemoryBackend``: per-process dict; fastest, but each worker has its own
+  counts and they vanish on restart.
+- ``SQLiteBackend``: a small SQLite file shared by all workers on one host.
+- ``RedisBackend``: any server speaking the Redis protocol (Redis, Valkey,
+  KeyDB, ...), shared across hosts. Uses a built-in minimal RESP client so
+  no extra dependency is required.
+
+Select one with ``RATE_LIMIT_BACKEND`` (see :func:`create_backend_from_env`).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sqlite3
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+
+class RateLimitBackend:
+    """Interface for rate-limit counter stores."""
+
+    #: True if counts are shared between processes. Shared backends need
+    #: windows aligned to wall-clock time so every worker agrees on them.
+    shared = False
+
+    async def increment(
+        self, key: str, window_index: int, window_seconds: int
+    ) -> Tuple[int, int]:
+        """
+        Count one hit for ``key`` in window ``window_index``.
+
+        Returns:
+            (previous_window_count, current_window_count_including_this_hit)
+        """
+        raise NotImplementedError
+
+    async def evict_expired(self, now: float) -> int:
+        """Drop counters that can no longer affect a decision; returns how many."""
+        return 0
+
+    async def clear(self) -> None:
+        """Forget all counters."""
+
+    async def close(self) -> None:
+        """Release connections/files."""
+
+
+class _Window:
+    """Sliding-window counter state for one key: two integers and a float."""
+
+    __slots__ = ("window_seconds", "index", "previous", "current")
+
+    def __init__(self, window_seconds: float, index: int):
+        self.window_seconds = window_seconds
+        self.index = index
+        self.previous = 0
+        self.current = 0
+
+
+class MemoryBackend(RateLimitBackend):
+    """In-process counters with O(1) memory per key."""
+
+    # Keys checked per event-loop turn during eviction (a few ms of work).
+    EVICT_CHUNK_SIZE = 5000
+
+    def __init__(self) -> None:
+        self._windows: Dict[str, _Window] = {}
+
+    def increment_sync(
+        self, key: str, window_index: int, window_seconds: int
+    ) -> Tuple[int, int]:
+        state = self._windows.get(key)
+        if state is None:
+            state = self._windows[key] = _Window(window_seconds, window_index)
+        elif state.index != window_index:
+            # Roll forward: the old current window becomes the previous one,
+            # unless more than one full window has passed.
+            state.previous = state.current if window_index - state.index == 1 else 0
+            state.current = 0
+            state.index = window_index
+        state.current += 1
+        return state.previous, state.current
+
+    async def increment(
+        self, key: str, window_index: int, window_seconds: int
+    ) -> Tuple[int, int]:
+        return self.increment_sync(key, window_index, window_seconds)
+
+    async def evict_expired(self, now: float) -> int:
+        """
+        Scan a snapshot of the keys in chunks, yielding to the event loop
+        between them so a large table never stalls requests for the whole
+        scan. Keys hit again meanwhile have moved on and are kept.
+        """
+        keys = list(self._windows)
+        evicted = 0
+        for start in range(0, len(keys), self.EVICT_CHUNK_SIZE):
+            for key in keys[start:start + self.EVICT_CHUNK_SIZE]:
+                state = self._windows.get(key)
+                if state is not None and int(now // state.window_seconds) - state.index >= 2:
+                    del self._windows[key]
+                    evicted += 1
+            await asyncio.sleep(0)
+        return evicted
+
+    async def clear(self) -> None:
+        self._windows.clear()
+
+    def __len__(self) -> int:
+        return len(self._windows)
+
+
+class SQLiteBackend(RateLimitBackend):
+    """
+    Counters in a SQLite file, shared by every worker process on the host.
+
+    Each hit is a single UPSERT ... RETURNING (atomic under SQLite's write
+    lock) plus a primary-key read of the previous window. Durability is
+    traded for speed (``synchronous=OFF``): losing the last few counts in a
+    power failure is harmless for rate limiting.
+    """
+
+    shared = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=5.0, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit_counters ("
+            " key TEXT NOT NULL,"
+            " window INTEGER NOT NULL,"
+            " count INTEGER NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " PRIMARY KEY (key, window)"
+            ") WITHOUT ROWID"
+        )
+
+    def _increment(self, key: str, window_index: int, window_seconds: int) -> Tuple[int, int]:
+        expires_at = (window_index + 2) * window_seconds
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                current = self._conn.execute(
+                    "INSERT INTO rate_limit_counters (key, window, count, expires_at)"
+                    " VALUES (?, ?, 1, ?)"
+                    " ON CONFLICT (key, window) DO UPDATE SET count = count + 1"
+                    " RETURNING count",
+                    (key, window_index, expires_at),
+                ).fetchone()[0]
+                row = self._conn.execute(
+                    "SELECT count FROM rate_limit_counters WHERE key = ? AND window = ?",
+                    (key, window_index - 1),
+                ).fetchone()
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return (row[0] if row else 0), current
+
+    async def increment(
+        self, key: str, window_index: int, window_seconds: int
+    ) -> Tuple[int, int]:
+        return await asyncio.to_thread(self._increment, key, window_index, window_seconds)
+
+    def _evict(self, now: float) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM rate_limit_counters WHERE expires_at <= ?", (now,)
+            )
+            return cursor.rowcount
+
+    async def evict_expired(self, now: float) -> int:
+        return await asyncio.to_thread(self._evict, now)
+
+    def _clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM rate_limit_counters")
+
+    async def clear(self) -> None:
+        await asyncio.to_thread(self._clear)
+
+    def _close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    async def close(self) -> None:
+        await asyncio.to_thread(self._close)
+
+
+class RedisError(Exception):
+    """Error reply from a Redis-protocol server."""
+
+
+class RedisBackend(RateLimitBackend):
+    """
+    Counters in a Redis-protocol server, shared across hosts.
+
+    Each hit runs ``MULTI / INCR / EXPIRE / GET previous / EXEC`` as one
+    pipelined round-trip, so the increment and its expiry are atomic and
+    keys clean themselves up after two windows.
+    """
+
+    shared = True
+
+    def __init__(self, url: str, prefix: str = "ratelimit:", timeout: float = 1.0):
+        parsed = urlparse(url)
+        if parsed.scheme not in ("redis", ""):
+            raise ValueError(f"Unsupported Redis URL scheme: {parsed.scheme!r}")
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.prefix = prefix
+        self.timeout = timeout
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    # -- RESP protocol ------------------------------------------------------
+
+    @staticmethod
+    def _encode(*args: Any) -> bytes:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(parts)
+
+    async def _read_reply(self) -> Any:
+        assert self._reader is not None
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise RedisError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length == -1:
+                return None
+            data = await self._reader.readexactly(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            length = int(payload)
+            if length == -1:
+                return None
+            return [await self._read_reply() for _ in range(length)]
+        raise RedisError(f"Unexpected reply: {line!r}")
+
+    async def _connect(self) -> None:
+        """
+        Open the connection and run AUTH/SELECT.
+
+        If any setup step fails or times out the connection is dropped, so
+        commands are never sent unauthenticated or to the wrong database.
+        """
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout
+        )
+        setup: List[Tuple[Any, ...]] = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        try:
+            for command in setup:
+                self._writer.write(self._encode(*command))
+                await asyncio.wait_for(self._writer.drain(), self.timeout)
+                await asyncio.wait_for(self._read_reply(), self.timeout)
+        except BaseException:
+            await self._reset()
+            raise
+
+    async def _pipeline(self, *commands: Tuple[Any, ...]) -> List[Any]:
+        """
+        Send commands in one write and read all replies.
+
+        A pooled connection the server has since closed is replaced before
+        anything is sent on it. Once commands are written nothing is
+        retried: if the reply is lost the server may already have applied
+        them, so the connection is dropped and the error raised (the
+        limiter then fails open rather than counting a hit twice).
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._writer is not None and (
+                self._writer.is_closing() or self._reader is None or self._reader.at_eof()
+            ):
+                await self._reset()
+            if self._writer is None:
+                await self._connect()
+            assert self._writer is not None
+            try:
+                self._writer.write(b"".join(self._encode(*c) for c in commands))
+                await self._writer.drain()
+                return await asyncio.wait_for(
+                    self._gather_replies(len(commands)), self.timeout
+                )
+            except BaseException:
+                await self._reset()
+                raise
+
+    async def _gather_replies(self, count: int) -> List[Any]:
+        replies: List[Any] = []
+        for _ in range(count):
+            try:
+                replies.append(await self._read_reply())
+            except RedisError as e:
+                replies.append(e)
+        return replies
+
+    async def _reset(self) -> None:
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    # -- backend interface --------------------------------------------------
+
+    async def increment(
+        self, key: str, window_index: int, window_seconds: int
+    ) -> Tuple[int, int]:
+        current_key = f"{self.prefix}{key}:{window_index}"
+        previous_key = f"{self.prefix}{key}:{window_index - 1}"
+        replies = await self._pipeline(
+            ("MULTI",),
+            ("INCR", current_key),
+            ("EXPIRE", current_key, window_seconds * 2),
+            ("GET", previous_key),
+            ("EXEC",),
+        )
+        result = replies[-1]
+        if isinstance(result, Exception):
+            raise result
+        current, _, previous = result
+        return (int(previous) if previous is not None else 0), int(current)
+
+    async def clear(self) -> None:
+        # Only our own keys; never FLUSHDB a shared server.
+        cursor = b"0"
+        while True:
+            (reply,) = await self._pipeline(("SCAN", cursor, "MATCH", f"{self.prefix}*", "COUNT", 500))
+            cursor, keys = reply
+            if keys:
+                await self._pipeline(("DEL", *keys))
+            if cursor in (b"0", "0"):
+                break
+
+    async def close(self) -> None:
+        await self._reset()
+
+
+def create_backend_from_env() -> RateLimitBackend:
+    """
+    Build the backend selected by ``RATE_LIMIT_BACKEND``.
+
+    - ``memory`` (default)
+    - ``sqlite``: file at ``RATE_LIMIT_SQLITE_PATH`` (default: temp dir)
+    - ``redis``: server at ``RATE_LIMIT_REDIS_URL`` (default redis://localhost:6379/0)
+    """
+    name = os.getenv("RATE_LIMIT_BACKEND", "memory").strip().lower()
+    if name == "memory":
+        return MemoryBackend()
+    if name == "sqlite":
+        path = os.getenv(
+            "RATE_LIMIT_SQLITE_PATH",
+            os.path.join(tempfile.gettempdir(), "tuneeng-ratelimit.db"),
+        )
+        return SQLiteBackend(path)
+    if name == "redis":
+        return RedisBackend(os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0"))
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {name!r}")
@@ -6,7 +6,7 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Date, DateTime, Float, ForeignKey, Index, Integer, String
 
 from .database import Base
 
@@ -74,4 +74,99 @@ class WritingQuestion(Base):
     content = Column(String, nullable=False)
 
 
+class PracticeAttempt(Base):
+    """
+    A scored practice attempt.
+
+    Fields:
+        - id: primary key
+        - user_id: the user who made the attempt
+        - skill_type: listening, speaking, reading or writing
+        - score: points awarded (0-100)
+        - created_at: when the attempt was scored
+    """
+
+    __tablename__ = "practice_attempts"
+    __table_args__ = (Index("ix_practice_attempts_user_created", "user_id", "created_at"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    skill_type = Column(String(16), nullable=False)
+    score = Column(Float, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class LeaderboardScore(Base):
+    """
+    Running leaderboard totals, one row per user and skill.
+
+    Maintained incrementally as attempts are scored (see
+    ``app.leaderboards``) so rankings never re-sum ``practice_attempts``.
+    The ``overall`` row also carries the user's daily practice streak.
+
+    Fields:
+        - user_id, skill_type: primary key (skill_type may be ``overall``)
+        - score: total points
+        - attempts: number of scored attempts
+        - streak_days: consecutive days with an attempt (``overall`` only)
+        - last_active_on: date of the latest attempt (``overall`` only)
+        - updated_at: last change, used by workers to pull each other's updates
+    """
+
+    __tablename__ = "leaderboard_scores"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    skill_type = Column(String(16), primary_key=True)
+    score = Column(Float, nullable=False, default=0.0)
+    attempts = Column(Integer, nullable=False, default=0)
+    streak_days = Column(Integer, nullable=False, default=0)
+    last_active_on = Column(Date, nullable=True)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+
+class LeaderboardBucket(Base):
+    """
+    Points per user, skill and time bucket, for period leaderboards.
+
+    Scoring an attempt adds to the current ``day`` bucket; the daily,
+    weekly and monthly boards are sums of the last 1, 7 and 30 day buckets.
+    Day buckets that no window needs any more are folded into one
+    ``month`` bucket per calendar month by the compaction job.
+
+    Fields:
+        - user_id, skill_type, granularity, starts_on: primary key
+          (granularity is ``day`` or ``month``; skill_type may be ``overall``)
+        - score: points earned in the bucket
+        - attempts: attempts scored in the bucket
+        - updated_at: last change, used by workers to pull each other's updates
+    """
+
+    __tablename__ = "leaderboard_buckets"
+    __table_args__ = (Index("ix_leaderboard_buckets_granularity_starts", "granularity", "starts_on"),)
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    skill_type = Column(String(16), primary_key=True)
+    granularity = Column(String(8), primary_key=True)
+    starts_on = Column(Date, primary_key=True)
+    score = Column(Float, nullable=False, default=0.0)
+    attempts = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+
+class CohortMember(Base):
+    """
+    Membership of a user in a cohort (a customer organization or batch).
+
+    Cohorts have private leaderboards (``/api/leaderboard/?cohort=``). A
+    user may belong to several cohorts.
+
+    Fields:
+        - cohort, user_id: primary key
+        - created_at: when the user joined, used by workers to pull new members
+    """
+
+    __tablename__ = "cohort_members"
 
+    cohort = Column(String(64), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True, index=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
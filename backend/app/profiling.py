@@ -0,0 +1,155 @@
+"""
+Low-overhead sampling profiler for live workers.
+
+``StackSampler`` runs in a background thread and snapshots the Python
+stacks of the process (``sys._current_frames``) at a fixed interval. The
+profiled code is never instrumented, so the cost is a few microseconds per
+sample and nothing at all between samples. Results are "collapsed stacks"
+(``frame;frame;frame count`` per line), the input format of flamegraph.pl,
+speedscope and similar tools.
+
+Two entry points use it:
+
+- ``GET /api/debug/profile?seconds=N`` (admins, when
+  ``TUNEENG_PROFILER_ENABLED`` is set) profiles the whole worker.
+- ``TUNEENG_PROFILE_REQUESTS=<fraction>`` profiles a random sample of
+  requests and writes one ``.folded`` file per request to
+  ``TUNEENG_PROFILE_DIR``, keeping the newest ``TUNEENG_PROFILE_KEEP``.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+PROFILER_ENABLED = os.getenv("TUNEENG_PROFILER_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILE_MAX_SECONDS = 60.0
+
+# Sampling a request costs a thread start plus the samples; keep it rare.
+PROFILE_REQUESTS_FRACTION = float(os.getenv("TUNEENG_PROFILE_REQUESTS", "0") or 0)
+PROFILE_DIR = Path(
+    os.getenv("TUNEENG_PROFILE_DIR", os.path.join(tempfile.gettempdir(), "tuneeng-profiles"))
+)
+PROFILE_KEEP = int(os.getenv("TUNEENG_PROFILE_KEEP", "100"))
+PROFILE_INTERVAL_SECONDS = float(os.getenv("TUNEENG_PROFILE_INTERVAL_MS", "5")) / 1000
+
+# Only one whole-process profile at a time; samples from two would mix.
+_profile_lock = threading.Lock()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{code.co_name}"
+
+
+class StackSampler:
+    """
+    Collect collapsed stacks from a background thread.
+
+    Args:
+        interval: Seconds between samples.
+        thread_ids: Only sample these threads (default: every thread except
+            the sampler itself).
+    """
+
+    def __init__(
+        self,
+        interval: float = PROFILE_INTERVAL_SECONDS,
+        thread_ids: Optional[Iterable[int]] = None,
+    ):
+        self.interval = max(0.0005, interval)
+        self.thread_ids = frozenset(thread_ids) if thread_ids is not None else None
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "StackSampler":
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> "StackSampler":
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        names: Dict[int, str] = {}
+        while not self._stop.wait(self.interval):
+            for thread in threading.enumerate():
+                names.setdefault(thread.ident, thread.name)
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if self.thread_ids is not None and thread_id not in self.thread_ids:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(labels))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """Stacks in collapsed format, most frequent first."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def profile_process(seconds: float, interval: float = PROFILE_INTERVAL_SECONDS) -> StackSampler:
+    """
+    Sample every thread of this process for ``seconds`` (blocking).
+
+    Raises:
+        RuntimeError: if another whole-process profile is already running.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise RuntimeError("A profile is already running")
+    try:
+        sampler = StackSampler(interval).start()
+        time.sleep(seconds)
+        return sampler.stop()
+    finally:
+        _profile_lock.release()
+
+
+class RequestProfileStore:
+    """Write per-request profiles to a directory, keeping only the newest."""
+
+    def __init__(self, directory: Path = PROFILE_DIR, keep: int = PROFILE_KEEP):
+        self.directory = Path(directory)
+        self.keep = max(1, keep)
+        self._lock = threading.Lock()
+
+    def save(
+        self, method: str, path: str, duration_seconds: float, sampler: StackSampler
+    ) -> Path:
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_")[:80] or "root"
+        # Sortable timestamp first so rotation can drop the oldest by name.
+        stamp = f"{time.strftime('%Y%m%dT%H%M%S')}.{time.time_ns() % 10**9:09d}"
+        name = f"{stamp}-{method}-{slug}-{duration_seconds * 1000:.0f}ms.folded"
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            target = self.directory / name
+            target.write_text(sampler.collapsed())
+            self._rotate()
+        return target
+
+    def _rotate(self) -> None:
+        profiles = sorted(self.directory.glob("*.folded"))
+        for old in profiles[: max(0, len(profiles) - self.keep)]:
+            try:
+                old.unlink()
+            except OSError:
+                pass
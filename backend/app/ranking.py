@@ -0,0 +1,161 @@
+"""
+Order-statistic index used by the leaderboards.
+
+``RankIndex`` is a sorted multiset of keys split into chunks of a few
+hundred items, with a Fenwick tree over the chunk sizes. Inserting or
+removing a key is a bisect into one short list plus a tree update, and the
+position of a key (its rank) or the key at a position is found by walking
+the tree: all O(log n). Chunking keeps the constant factors those of
+``list``/``bisect`` in C, and memory close to one pointer per key.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Iterable, Iterator, List, Tuple
+
+
+class RankIndex:
+    """Sorted multiset with O(log n) insert, remove, rank and select."""
+
+    # Chunks are split when they reach twice this size.
+    LOAD = 512
+
+    def __init__(self, keys: Iterable[Any] = ()):
+        ordered = sorted(keys)
+        self._chunks: List[List[Any]] = [
+            ordered[i:i + self.LOAD] for i in range(0, len(ordered), self.LOAD)
+        ]
+        self._maxes: List[Any] = [chunk[-1] for chunk in self._chunks]
+        self._len = len(ordered)
+        self._rebuild_tree()
+
+    # -- Fenwick tree over chunk lengths -------------------------------------
+
+    def _rebuild_tree(self) -> None:
+        tree = [0] + [len(chunk) for chunk in self._chunks]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _tree_add(self, chunk_index: int, delta: int) -> None:
+        i = chunk_index + 1
+        tree = self._tree
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, chunk_index: int) -> int:
+        """Number of keys in chunks before ``chunk_index``."""
+        total = 0
+        i = chunk_index
+        tree = self._tree
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def _locate(self, position: int) -> Tuple[int, int]:
+        """(chunk index, offset in chunk) of the key at ``position``."""
+        tree = self._tree
+        chunk_index = 0
+        step = 1 << (len(tree).bit_length() - 1)
+        remaining = position
+        while step:
+            probe = chunk_index + step
+            if probe < len(tree) and tree[probe] <= remaining:
+                chunk_index = probe
+                remaining -= tree[probe]
+            step >>= 1
+        return chunk_index, remaining
+
+    # -- public API ------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __contains__(self, key: Any) -> bool:
+        i = bisect_left(self._maxes, key)
+        if i == len(self._chunks):
+            return False
+        chunk = self._chunks[i]
+        j = bisect_left(chunk, key)
+        return j < len(chunk) and chunk[j] == key
+
+    def add(self, key: Any) -> None:
+        if not self._chunks:
+            self._chunks.append([key])
+            self._maxes.append(key)
+            self._len = 1
+            self._rebuild_tree()
+            return
+        i = bisect_right(self._maxes, key)
+        if i == len(self._chunks):
+            i -= 1
+            self._chunks[i].append(key)
+            self._maxes[i] = key
+        else:
+            insort(self._chunks[i], key)
+        self._len += 1
+        chunk = self._chunks[i]
+        if len(chunk) > 2 * self.LOAD:
+            self._chunks[i:i + 1] = [chunk[:self.LOAD], chunk[self.LOAD:]]
+            self._maxes[i:i + 1] = [chunk[self.LOAD - 1], chunk[-1]]
+            self._rebuild_tree()
+        else:
+            self._tree_add(i, 1)
+
+    def remove(self, key: Any) -> None:
+        """Remove one occurrence of ``key``; raises KeyError if absent."""
+        i = bisect_left(self._maxes, key)
+        if i == len(self._chunks):
+            raise KeyError(key)
+        chunk = self._chunks[i]
+        j = bisect_left(chunk, key)
+        if j == len(chunk) or chunk[j] != key:
+            raise KeyError(key)
+        del chunk[j]
+        self._len -= 1
+        if not chunk:
+            del self._chunks[i]
+            del self._maxes[i]
+            self._rebuild_tree()
+        else:
+            self._maxes[i] = chunk[-1]
+            self._tree_add(i, -1)
+
+    def index(self, key: Any) -> int:
+        """Number of keys strictly less than ``key`` (its 0-based rank)."""
+        i = bisect_left(self._maxes, key)
+        if i == len(self._chunks):
+            return self._len
+        return self._prefix(i) + bisect_left(self._chunks[i], key)
+
+    def __getitem__(self, position: int) -> Any:
+        if position < 0:
+            position += self._len
+        if not 0 <= position < self._len:
+            raise IndexError(position)
+        i, j = self._locate(position)
+        return self._chunks[i][j]
+
+    def islice(self, start: int = 0, stop: int = None) -> Iterator[Any]:
+        """Iterate keys at positions ``start`` to ``stop`` without copying."""
+        stop = self._len if stop is None else min(stop, self._len)
+        start = max(0, start)
+        if start >= stop:
+            return
+        i, j = self._locate(start)
+        remaining = stop - start
+        while remaining > 0:
+            chunk = self._chunks[i]
+            take = chunk[j:j + remaining]
+            yield from take
+            remaining -= len(take)
+            i, j = i + 1, 0
+
+    def __iter__(self) -> Iterator[Any]:
+        for chunk in self._chunks:
+            yield from chunk
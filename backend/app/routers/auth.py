@@ -1,22 +1,27 @@
-from typing import Optional, Dict, Any
+from collections import Counter
+from typing import Optional, Dict, Any, List, Union
 import re
 
-from fastapi import APIRouter, HTTPException, Depends, status, Request
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from pydantic import BaseModel, EmailStr, validator
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, status, Request
+from pydantic import BaseModel, EmailStr, Field, validator
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
-from app.models import User
+from app.database import AsyncSessionLocal, get_async_db, write_transaction
+from app.deps import AdminUser, AuthenticatedUser, CurrentUser
+from app.leaderboards import leaderboard_engine
+from app.models import CohortMember, User
 from app.security import (
-    get_password_hash,
-    verify_password,
+    HashingPoolBusy,
+    aget_password_hash,
+    aget_password_hashes,
+    averify_password,
     create_access_token,
-    decode_access_token,
+    password_needs_rehash,
 )
 
 router = APIRouter()
-security = HTTPBearer()
 
 
 class UserRegister(BaseModel):
@@ -65,6 +70,14 @@ class UserRegister(BaseModel):
         return v
 
 
+class BulkUserRegister(BaseModel):
+    """Bulk registration request model (cohort onboarding)."""
+    users: List[UserRegister] = Field(..., min_length=1, max_length=500)
+    cohort: Optional[str] = Field(
+        None, pattern=r"^[A-Za-z0-9_.-]{1,64}$", description="Cohort to add the users to"
+    )
+
+
 class UserLogin(BaseModel):
     """User login request model."""
     email: EmailStr
@@ -86,8 +99,8 @@ class TokenResponse(BaseModel):
     user: UserResponse
 
 
-def _user_to_response(user: User) -> UserResponse:
-    """Helper to convert ORM User to Pydantic response model."""
+def _user_to_response(user: Union[User, AuthenticatedUser]) -> UserResponse:
+    """Helper to convert a User (ORM or authenticated snapshot) to the response model."""
     return UserResponse(
         id=user.id,
         email=user.email,
@@ -96,70 +109,204 @@ def _user_to_response(user: User) -> UserResponse:
     )
 
 
+def _username_for(user_data: UserRegister) -> str:
+    """Requested username, or the email's local part if none was given."""
+    return user_data.username or user_data.email.split("@")[0]
+
+
+def _unique_violation_detail(exc: IntegrityError) -> str:
+    """
+    Map a unique-index violation on ``users`` to the client-facing message.
+
+    Only the first line of the driver message is inspected: it names the
+    constraint (``users.email`` on SQLite, ``ix_users_email`` on
+    PostgreSQL), while later lines may echo user-supplied values.
+    """
+    first_line = str(exc.orig).splitlines()[0].lower() if exc.orig else ""
+    if "email" in first_line:
+        return "Email already registered"
+    if "username" in first_line:
+        return "Username already taken"
+    return "User already exists"
+
+
+def _hashing_busy() -> HTTPException:
+    """503 returned when the password hashing pool is saturated."""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server is busy. Please try again shortly.",
+        headers={"Retry-After": "1"},
+    )
+
+
 @router.post(
     "/register",
     response_model=UserResponse,
     status_code=status.HTTP_201_CREATED,
 )
-async def register(user_data: UserRegister, db: Session = Depends(get_db)):
+async def register(user_data: UserRegister, db: AsyncSession = Depends(get_async_db)):
     """
     Register a new user in the database.
 
-    - Ensures email uniqueness.
-    - Optionally ensures username uniqueness if provided.
     - Hashes password before storing.
+    - Email and username uniqueness are enforced by the unique indexes on
+      ``users``; a violation is reported as a 400 without a prior SELECT,
+      which also closes the check-then-insert race between concurrent signups.
+    """
+    try:
+        hashed_password = await aget_password_hash(user_data.password)
+    except HashingPoolBusy:
+        raise _hashing_busy()
+
+    user = User(
+        email=user_data.email,
+        full_name=user_data.full_name,
+        username=_username_for(user_data),
+        hashed_password=hashed_password,
+    )
+    try:
+        async with write_transaction(db):
+            db.add(user)
+            await db.flush()  # Assign ID before commit for response
+    except IntegrityError as e:
+        detail = _unique_violation_detail(e)
+        if detail != "Email already registered":
+            # The database reports only one violated index; if both clash,
+            # the email message takes precedence as it always has.
+            email_taken = await db.scalar(
+                select(User.id).where(User.email == user_data.email).limit(1)
+            )
+            if email_taken is not None:
+                detail = "Email already registered"
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+    return _user_to_response(user)
+
+
+@router.post(
+    "/register/bulk",
+    response_model=List[UserResponse],
+    status_code=status.HTTP_201_CREATED,
+)
+async def register_bulk(
+    payload: BulkUserRegister,
+    admin: AdminUser,
+    db: AsyncSession = Depends(get_async_db),
+):
     """
-    existing = db.query(User).filter(User.email == user_data.email).first()
-    if existing:
+    Register a cohort of users in one transaction - admin only.
+
+    Passwords are hashed in parallel on the hashing pool and all rows are
+    inserted in a single batched flush; if any user conflicts, none are
+    created. With ``cohort`` set, the users join that cohort's private
+    leaderboard.
+    """
+    emails = [u.email for u in payload.users]
+    usernames = [_username_for(u) for u in payload.users]
+    for label, values in (("emails", emails), ("usernames", usernames)):
+        duplicates = sorted(v for v, count in Counter(values).items() if count > 1)
+        if duplicates:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Duplicate {label} in request: {', '.join(duplicates)}",
+            )
+
+    taken = (
+        await db.scalars(select(User.email).where(User.email.in_(emails)))
+    ).all()
+    if taken:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered",
+            detail=f"Email already registered: {', '.join(sorted(taken))}",
         )
 
-    username = user_data.username or user_data.email.split("@")[0]
-
-    # If username is provided or derived, ensure it is unique.
-    username_conflict = (
-        db.query(User).filter(User.username == username).first()
-        if username is not None
-        else None
-    )
-    if username_conflict:
+    try:
+        hashes = await aget_password_hashes([u.password for u in payload.users])
+    except HashingPoolBusy:
+        raise _hashing_busy()
+
+    users = [
+        User(
+            email=u.email,
+            full_name=u.full_name,
+            username=username,
+            hashed_password=hashed,
+        )
+        for u, username, hashed in zip(payload.users, usernames, hashes)
+    ]
+    try:
+        async with write_transaction(db):
+            db.add_all(users)
+            await db.flush()
+            if payload.cohort:
+                db.add_all(CohortMember(cohort=payload.cohort, user_id=u.id) for u in users)
+    except IntegrityError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already taken",
+            detail=_unique_violation_detail(e),
         )
+    if payload.cohort:
+        leaderboard_engine.members_added(payload.cohort, [u.id for u in users])
 
-    hashed_password = get_password_hash(user_data.password)
+    return [_user_to_response(u) for u in users]
 
-    user = User(
-        email=user_data.email,
-        full_name=user_data.full_name,
-        username=username,
-        hashed_password=hashed_password,
-    )
-    db.add(user)
-    db.flush()  # Assign ID before commit for response
 
-    return _user_to_response(user)
+async def _rehash_password(user_id: int, old_hash: str, password: str) -> None:
+    """
+    Background task: re-hash a password with the current bcrypt cost.
+
+    The update is conditional on the stored hash being unchanged, so a
+    password change that races with this task is never overwritten.
+    """
+    try:
+        new_hash = await aget_password_hash(password)
+    except HashingPoolBusy:
+        # Pool is saturated; the next successful login will try again.
+        return
+
+    try:
+        async with AsyncSessionLocal() as db, write_transaction(db):
+            await db.execute(
+                update(User)
+                .where(User.id == user_id, User.hashed_password == old_hash)
+                .values(hashed_password=new_hash)
+            )
+    except Exception as e:
+        print(f"⚠️  Failed to rehash password for user {user_id}: {e}")
 
 
 @router.post("/login", response_model=TokenResponse)
-async def login(credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(
+    credentials: UserLogin,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+):
     """
     Authenticate user and return a JWT access token.
 
     - Looks up the user by email.
     - Verifies the password using bcrypt.
+    - Schedules a background rehash if the stored bcrypt cost is outdated.
     - Returns a bearer token and basic user info.
     """
-    user = db.query(User).filter(User.email == credentials.email).first()
-    if not user or not verify_password(credentials.password, user.hashed_password):
+    user = await db.scalar(select(User).where(User.email == credentials.email).limit(1))
+    try:
+        password_ok = user is not None and await averify_password(
+            credentials.password, user.hashed_password
+        )
+    except HashingPoolBusy:
+        raise _hashing_busy()
+    if not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password",
         )
 
+    if password_needs_rehash(user.hashed_password):
+        background_tasks.add_task(
+            _rehash_password, user.id, user.hashed_password, credentials.password
+        )
+
     token_data: Dict[str, Any] = {"sub": str(user.id)}
     access_token = create_access_token(token_data)
 
@@ -179,31 +326,10 @@ async def logout():
 
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db),
-):
+async def get_current_user(current_user: CurrentUser):
     """
     Get current authenticated user from the JWT access token.
 
     The token must be sent as an `Authorization: Bearer <token>` header.
     """
-    token = credentials.credentials
-    try:
-        payload = decode_access_token(token)
-        user_id = int(payload.get("sub"))
-    except Exception:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid or expired token",
-        )
-
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-        )
-
-    return _user_to_response(user)
-
+    return _user_to_response(current_user)
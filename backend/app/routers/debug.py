@@ -0,0 +1,37 @@
+"""
+Debugging endpoints for live workers (admins only).
+"""
+
+import asyncio
+
+from fastapi import APIRouter, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+from app.deps import AdminUser
+from app.profiling import PROFILE_MAX_SECONDS, PROFILER_ENABLED, profile_process
+
+router = APIRouter()
+
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def profile(
+    admin: AdminUser,
+    seconds: float = Query(10.0, gt=0, le=PROFILE_MAX_SECONDS),
+    interval_ms: float = Query(5.0, ge=1, le=1000),
+):
+    """
+    Sample this worker's stacks for ``seconds`` and return collapsed stacks.
+
+    The output can be fed to flamegraph.pl or opened in speedscope. The
+    request only profiles the worker process that happens to serve it.
+    """
+    if not PROFILER_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+    try:
+        sampler = await asyncio.to_thread(profile_process, seconds, interval_ms / 1000)
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    return PlainTextResponse(
+        sampler.collapsed(),
+        headers={"X-Profile-Samples": str(sampler.samples)},
+    )
@@ -4,12 +4,33 @@ Leaderboard Router
 Handles leaderboard rankings, user scores, and competitive features.
 """
 
-from fastapi import APIRouter, Query
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, Response, status
+from pydantic import BaseModel, Field
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
+from enum import Enum
+
+from app.database import get_async_db
+from app.deps import AdminUser, OptionalUser, is_admin
+from app.frontend import etag_matches
+from app.leaderboards import leaderboard_engine, leaderboard_pages
+from app.metrics import LEADERBOARD_CACHE_REQUESTS
+from app.models import User
+from app.routers.practice import SkillType
 
 router = APIRouter()
 
+COHORT_PATTERN = r"^[A-Za-z0-9_.-]{1,64}$"
+
+
+class LeaderboardPeriod(str, Enum):
+    """Leaderboard periods; daily/weekly/monthly are rolling 1/7/30-day windows."""
+    DAILY = "daily"
+    WEEKLY = "weekly"
+    MONTHLY = "monthly"
+    ALL_TIME = "all_time"
+
 
 class LeaderboardEntry(BaseModel):
     """Leaderboard entry model."""
@@ -22,52 +43,140 @@ class LeaderboardEntry(BaseModel):
     avatar_url: Optional[str] = None
 
 
+class UserRank(BaseModel):
+    """A user's position on a leaderboard."""
+    user_id: int
+    skill_type: Optional[str] = None
+    period: LeaderboardPeriod
+    cohort: Optional[str] = None
+    rank: int
+    total_score: float
+    percentile: float
+    ranked_users: int
+    neighbors: List[LeaderboardEntry]
+
+
+class CohortMembers(BaseModel):
+    """Users to add to a cohort."""
+    user_ids: List[int] = Field(..., min_length=1, max_length=1000)
+
+
+async def _authorize_cohort(cohort: Optional[str], current_user) -> None:
+    """
+    Cohort boards are private: load one for its members and admins only.
+
+    Membership is checked before the cohort is loaded, so requests for
+    cohorts the caller is not in cost one row lookup and never touch the
+    cohort cache.
+    """
+    if cohort is None:
+        return
+    if current_user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Sign in to view cohort leaderboards",
+        )
+    if not is_admin(current_user) and not await leaderboard_engine.is_cohort_member(
+        cohort, current_user.id
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not a member of this cohort",
+        )
+    await leaderboard_engine.ensure_cohort(cohort)
+
+
 @router.get("/", response_model=List[LeaderboardEntry])
 async def get_leaderboard(
-    skill_type: Optional[str] = Query(None, description="Filter by skill type"),
+    request: Request,
+    current_user: OptionalUser,
+    skill_type: Optional[SkillType] = Query(None, description="Filter by skill type"),
     limit: int = Query(100, ge=1, le=1000, description="Number of entries to return"),
+    period: LeaderboardPeriod = Query(LeaderboardPeriod.ALL_TIME, description="Time window"),
+    cohort: Optional[str] = Query(None, pattern=COHORT_PATTERN, description="Rank within a cohort"),
 ):
-    """Get leaderboard rankings."""
-    # Placeholder implementation
-    return [
-        {
-            "rank": 1,
-            "user_id": 1,
-            "username": "top_student",
-            "total_score": 95.5,
-            "skill_scores": {
-                "listening": 92,
-                "speaking": 98,
-                "reading": 95,
-                "writing": 97,
-            },
-            "streak_days": 30,
-            "avatar_url": None,
-        },
-        {
-            "rank": 2,
-            "user_id": 2,
-            "username": "second_place",
-            "total_score": 94.0,
-            "skill_scores": {
-                "listening": 90,
-                "speaking": 96,
-                "reading": 94,
-                "writing": 96,
-            },
-            "streak_days": 25,
-            "avatar_url": None,
-        },
-    ]
-
-
-@router.get("/user/{user_id}/rank")
-async def get_user_rank(user_id: int):
-    """Get specific user's rank on the leaderboard."""
-    # Placeholder implementation
-    return {
-        "user_id": user_id,
-        "rank": 1,
-        "total_score": 95.5,
+    """
+    Get leaderboard rankings.
+
+    Served from the in-memory boards in ``app.leaderboards``; the database
+    is only read if this worker has not loaded them (or the cohort) yet.
+    Cohort leaderboards require authentication as a member or admin.
+
+    Pages are serialized once per leaderboard change and cached; clients
+    revalidate with ``If-None-Match`` and get a bodyless 304 until the
+    page changes.
+    """
+    await leaderboard_engine.ensure_loaded()
+    await _authorize_cohort(cohort, current_user)
+
+    skill = skill_type.value if skill_type else None
+    key = (cohort, skill, period.value, limit)
+    version = leaderboard_engine.cache_version(cohort)
+    cached = leaderboard_pages.get(key, version)
+    if cached is None:
+        result = "miss"
+        cached = leaderboard_pages.put(
+            key, version, leaderboard_engine.top(skill, limit, period.value, cohort)
+        )
+    else:
+        result = "hit"
+    body, etag = cached
+
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache" if cohort else "no-cache",
     }
+    if cohort:
+        headers["Vary"] = "Authorization"
+    if etag_matches(request.headers.get("if-none-match"), (etag,)):
+        LEADERBOARD_CACHE_REQUESTS.inc("not_modified")
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    LEADERBOARD_CACHE_REQUESTS.inc(result)
+    return Response(body, media_type="application/json", headers=headers)
 
+
+@router.get("/user/{user_id}/rank", response_model=UserRank)
+async def get_user_rank(
+    user_id: int,
+    current_user: OptionalUser,
+    skill_type: Optional[SkillType] = Query(None, description="Rank within one skill"),
+    neighbors: int = Query(0, ge=0, le=50, description="Users to include above and below"),
+    period: LeaderboardPeriod = Query(LeaderboardPeriod.ALL_TIME, description="Time window"),
+    cohort: Optional[str] = Query(None, pattern=COHORT_PATTERN, description="Rank within a cohort"),
+):
+    """
+    Get a user's rank on the leaderboard.
+
+    Ranks are dense (tied scores share a rank). Answered from the in-memory
+    boards in O(log n), without counting rows in the database.
+    """
+    await leaderboard_engine.ensure_loaded()
+    await _authorize_cohort(cohort, current_user)
+    result = leaderboard_engine.rank(
+        user_id, skill_type.value if skill_type else None, neighbors, period.value, cohort
+    )
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User is not on the leaderboard",
+        )
+    return result
+
+
+@router.post("/cohorts/{cohort}/members", status_code=status.HTTP_204_NO_CONTENT)
+async def add_cohort_members(
+    payload: CohortMembers,
+    admin: AdminUser,
+    cohort: str = Path(..., pattern=COHORT_PATTERN),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Add existing users to a cohort - admin only."""
+    user_ids = sorted(set(payload.user_ids))
+    found = set((await db.scalars(select(User.id).where(User.id.in_(user_ids)))).all())
+    missing = [user_id for user_id in user_ids if user_id not in found]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown user ids: {', '.join(map(str, missing))}",
+        )
+    await leaderboard_engine.add_cohort_members(db, cohort, user_ids)
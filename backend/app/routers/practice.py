@@ -5,13 +5,16 @@ Handles LSRW practice exercises, test sets, AI feedback, and practice sessions.
 """
 
 from fastapi import APIRouter, HTTPException, Depends, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from enum import Enum
 
+from app.database import get_async_db
+from app.deps import CurrentUser
+from app.leaderboards import leaderboard_engine
+
 router = APIRouter()
-security = HTTPBearer()
 
 
 class SkillType(str, Enum):
@@ -45,6 +48,21 @@ class PracticeSessionResponse(BaseModel):
     started_at: str
 
 
+class AttemptRequest(BaseModel):
+    """Scored attempt model."""
+    skill_type: SkillType
+    score: float = Field(..., ge=0, le=100)
+
+
+class AttemptResponse(BaseModel):
+    """Scored attempt result with the user's updated leaderboard totals."""
+    skill_type: SkillType
+    score: float
+    skill_score: float
+    total_score: float
+    streak_days: int
+
+
 class AIFeedbackRequest(BaseModel):
     """AI feedback request model."""
     session_id: str
@@ -95,7 +113,7 @@ async def get_exercises(skill_type: Optional[SkillType] = None):
 @router.post("/sessions", response_model=PracticeSessionResponse)
 async def start_practice_session(
     session_data: PracticeSessionRequest,
-    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user: CurrentUser,
 ):
     """Start a new practice session."""
     # Placeholder implementation
@@ -113,10 +131,26 @@ async def start_practice_session(
     }
 
 
+@router.post("/attempts", response_model=AttemptResponse, status_code=status.HTTP_201_CREATED)
+async def record_attempt(
+    attempt: AttemptRequest,
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Record a scored attempt and add its points to the leaderboards."""
+    return await leaderboard_engine.record_attempt(
+        db,
+        current_user.id,
+        current_user.username or current_user.full_name,
+        attempt.skill_type.value,
+        round(attempt.score, 2),
+    )
+
+
 @router.post("/feedback", response_model=AIFeedbackResponse)
 async def get_ai_feedback(
     feedback_request: AIFeedbackRequest,
-    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user: CurrentUser,
 ):
     """Get AI-powered feedback on practice submission."""
     # Placeholder implementation
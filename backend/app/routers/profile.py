@@ -5,12 +5,12 @@ Handles user profile management, preferences, learning stats, and personal infor
 """
 
 from fastapi import APIRouter, HTTPException, Depends, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 from typing import Optional, Dict, List, Any
 
+from app.deps import CurrentUser
+
 router = APIRouter()
-security = HTTPBearer()
 
 
 class ProfileUpdate(BaseModel):
@@ -45,15 +45,15 @@ class ProfileResponse(BaseModel):
 
 @router.get("/", response_model=ProfileResponse)
 async def get_profile(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user: CurrentUser,
 ):
     """Get current user's profile."""
-    # Placeholder implementation
+    # Placeholder stats; identity fields come from the authenticated user
     return {
-        "user_id": 1,
-        "email": "user@example.com",
-        "full_name": "Test User",
-        "username": "testuser",
+        "user_id": current_user.id,
+        "email": current_user.email,
+        "full_name": current_user.full_name,
+        "username": current_user.username,
         "bio": "Learning English for corporate success!",
         "avatar_url": None,
         "learning_stats": {
@@ -80,15 +80,15 @@ async def get_profile(
 @router.put("/", response_model=ProfileResponse)
 async def update_profile(
     profile_data: ProfileUpdate,
-    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user: CurrentUser,
 ):
     """Update user profile."""
     # Placeholder implementation
     return {
-        "user_id": 1,
-        "email": "user@example.com",
-        "full_name": profile_data.full_name or "Test User",
-        "username": profile_data.username or "testuser",
+        "user_id": current_user.id,
+        "email": current_user.email,
+        "full_name": profile_data.full_name or current_user.full_name,
+        "username": profile_data.username or current_user.username,
         "bio": profile_data.bio,
         "avatar_url": profile_data.avatar_url,
         "learning_stats": {
@@ -110,7 +110,7 @@ async def update_profile(
 
 @router.get("/stats", response_model=LearningStats)
 async def get_learning_stats(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user: CurrentUser,
 ):
     """Get user's learning statistics."""
     # Placeholder implementation
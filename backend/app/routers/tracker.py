@@ -5,13 +5,13 @@ Handles progress tracking, analytics, and performance metrics.
 """
 
 from fastapi import APIRouter, HTTPException, Depends, Query
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 from typing import List, Optional, Dict
 from datetime import datetime
 
+from app.deps import CurrentUser
+
 router = APIRouter()
-security = HTTPBearer()
 
 
 class ProgressEntry(BaseModel):
@@ -34,9 +34,9 @@ class ProgressSummary(BaseModel):
 
 @router.get("/progress", response_model=List[ProgressEntry])
 async def get_progress(
+    current_user: CurrentUser,
     skill_type: Optional[str] = Query(None, description="Filter by skill type"),
     days: int = Query(30, ge=1, le=365, description="Number of days to retrieve"),
-    credentials: HTTPAuthorizationCredentials = Depends(security),
 ):
     """Get user progress history."""
     # Placeholder implementation
@@ -60,7 +60,7 @@ async def get_progress(
 
 @router.get("/summary", response_model=ProgressSummary)
 async def get_progress_summary(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user: CurrentUser,
 ):
     """Get overall progress summary."""
     # Placeholder implementation
@@ -1,33 +1,23 @@
-from typing import Optional, List
+import json
+from typing import AsyncIterator, Optional, List, Union
 
-from fastapi import APIRouter, HTTPException, Depends, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi import APIRouter, HTTPException, Depends, Query, Response, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, EmailStr
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import get_async_read_db, read_session
+from app.deps import AdminUser, AuthenticatedUser, CurrentUser
 from app.models import User
-from app.security import decode_access_token
 
 router = APIRouter()
-security = HTTPBearer()
-
-
-def get_current_user_id(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db),
-) -> int:
-    """Get current authenticated user ID from JWT token."""
-    token = credentials.credentials
-    try:
-        payload = decode_access_token(token)
-        user_id = int(payload.get("sub"))
-        return user_id
-    except Exception:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid or expired token",
-        )
+
+# Rows fetched per keyset query when streaming the full export.
+EXPORT_BATCH_SIZE = 500
+
+# Only the columns exposed by UserResponse; never load hashed_password.
+_USER_COLUMNS = (User.id, User.email, User.full_name, User.username)
 
 
 class UserUpdate(BaseModel):
@@ -45,7 +35,7 @@ class UserResponse(BaseModel):
     username: Optional[str] = None
 
 
-def _user_to_response(user: User) -> UserResponse:
+def _user_to_response(user: Union[User, AuthenticatedUser]) -> UserResponse:
     return UserResponse(
         id=user.id,
         email=user.email,
@@ -54,26 +44,82 @@ def _user_to_response(user: User) -> UserResponse:
     )
 
 
+def _user_page_query(limit: int, after: Optional[int]):
+    """Keyset page: users with ``id > after`` in id order."""
+    query = select(*_USER_COLUMNS).order_by(User.id).limit(limit)
+    if after is not None:
+        query = query.where(User.id > after)
+    return query
+
+
 @router.get("/", response_model=List[UserResponse])
 async def get_users(
-    current_user_id: int = Depends(get_current_user_id),
-    db: Session = Depends(get_db),
+    current_user: CurrentUser,
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000, description="Maximum users to return"),
+    after: Optional[int] = Query(None, description="Cursor: return users with id greater than this"),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
     """
-    Get all users - requires authentication.
-    
+    Get users one page at a time - requires authentication.
+
+    Pages are ordered by id. When more users exist, the ``X-Next-Cursor``
+    response header holds the value to pass as ``after`` for the next page.
+
     Note: In production, add admin role check to restrict this endpoint.
     For now, any authenticated user can access this.
     """
-    users = db.query(User).all()
-    return [_user_to_response(u) for u in users]
+    rows = (await db.execute(_user_page_query(limit + 1, after))).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = str(rows[-1].id)
+    return [_user_to_response(row) for row in rows]
+
+
+async def _export_users_json() -> AsyncIterator[bytes]:
+    """Yield all users as one JSON array, a keyset batch per chunk."""
+    yield b"["
+    after: Optional[int] = None
+    first = True
+    # The request-scoped session is closed before the body streams, so the
+    # export opens its own.
+    async with read_session() as db:
+        while True:
+            rows = (await db.execute(_user_page_query(EXPORT_BATCH_SIZE, after))).all()
+            if not rows:
+                break
+            chunk = ",".join(
+                json.dumps(
+                    {
+                        "id": row.id,
+                        "email": row.email,
+                        "full_name": row.full_name,
+                        "username": row.username,
+                    }
+                )
+                for row in rows
+            )
+            yield (chunk if first else "," + chunk).encode("utf-8")
+            first = False
+            after = rows[-1].id
+    yield b"]"
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_users(admin: AdminUser):
+    """
+    Stream every user as a JSON array - admin only.
+
+    Memory use stays flat regardless of table size because rows are read
+    and serialized in keyset batches of ``EXPORT_BATCH_SIZE``.
+    """
+    return StreamingResponse(_export_users_json(), media_type="application/json")
 
 
 @router.get("/{user_id}", response_model=UserResponse)
 async def get_user(
     user_id: int,
-    current_user_id: int = Depends(get_current_user_id),
-    db: Session = Depends(get_db),
+    current_user: CurrentUser,
 ):
     """
     Get user by ID - requires authentication.
@@ -81,19 +127,13 @@ async def get_user(
     Users can only view their own profile unless they are admin.
     """
     # Users can only view their own data (or implement admin check)
-    if user_id != current_user_id:
+    if user_id != current_user.id:
         # In production, check if current_user is admin
         # For now, only allow viewing own profile
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You can only view your own profile",
         )
-    
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found",
-        )
-    return _user_to_response(user)
 
+    # The authenticated user was already loaded by the CurrentUser dependency.
+    return _user_to_response(current_user)
@@ -4,13 +4,22 @@ Security utilities for password hashing and JWT token handling.
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import math
 import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
 
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 
+from app.metrics import PASSWORD_HASH_DURATION, PASSWORD_HASH_WAIT, record
+
 
 # In production, set these via environment variables.
 SECRET_KEY = os.getenv("JWT_SECRET_KEY")
@@ -41,8 +50,23 @@ if not SECRET_KEY:
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
 
+# Verified-token cache (see TokenCache below).
+JWT_CACHE_ENABLED = os.getenv("JWT_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "4096"))
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt cost tuning. BCRYPT_ROUNDS pins an exact cost factor; otherwise, if
+# BCRYPT_TARGET_MS is set, the cost is calibrated at startup so one hash takes
+# roughly that long on the current hardware. Stored hashes whose cost falls
+# outside the accepted band are transparently rehashed on the next login.
+BCRYPT_ROUNDS = os.getenv("BCRYPT_ROUNDS")
+BCRYPT_TARGET_MS = os.getenv("BCRYPT_TARGET_MS")
+BCRYPT_MIN_ROUNDS = int(os.getenv("BCRYPT_MIN_ROUNDS", "10"))
+BCRYPT_MAX_ROUNDS = int(os.getenv("BCRYPT_MAX_ROUNDS", "16"))
+BCRYPT_ROUNDS_TOLERANCE = int(os.getenv("BCRYPT_ROUNDS_TOLERANCE", "1"))
+_BCRYPT_PROBE_ROUNDS = 8
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify that a plain text password matches a bcrypt hash."""
@@ -54,6 +78,214 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True if a stored hash uses a cost outside the currently accepted band."""
+    return pwd_context.needs_update(hashed_password)
+
+
+def calibrate_bcrypt_rounds(
+    target_ms: float,
+    min_rounds: int = BCRYPT_MIN_ROUNDS,
+    max_rounds: int = BCRYPT_MAX_ROUNDS,
+) -> int:
+    """
+    Pick the bcrypt cost factor whose hash time is closest to ``target_ms``.
+
+    Each extra round doubles the work, so a few cheap probe hashes are enough
+    to extrapolate: ``t(r) = t(probe) * 2 ** (r - probe)``.
+    """
+    handler = pwd_context.handler("bcrypt")
+    probe = handler.using(rounds=_BCRYPT_PROBE_ROUNDS)
+    elapsed = []
+    for _ in range(3):
+        started = time.perf_counter()
+        probe.hash("calibration-probe")
+        elapsed.append(time.perf_counter() - started)
+    probe_ms = max(min(elapsed) * 1000.0, 1e-3)
+
+    rounds = round(_BCRYPT_PROBE_ROUNDS + math.log2(target_ms / probe_ms))
+    return max(min_rounds, min(max_rounds, rounds))
+
+
+def set_bcrypt_rounds(rounds: int, tolerance: int = 0) -> None:
+    """
+    Make ``rounds`` the cost for new hashes.
+
+    Existing hashes more than ``tolerance`` rounds away from it are reported
+    by :func:`password_needs_rehash`, which lets costs move in either
+    direction without a data migration.
+    """
+    pwd_context.update(
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds - tolerance,
+        bcrypt__max_rounds=rounds + tolerance,
+    )
+
+
+def configure_password_hashing() -> int:
+    """
+    Apply BCRYPT_ROUNDS / BCRYPT_TARGET_MS to ``pwd_context``.
+
+    Intended to run once at startup. Calibrated costs get a tolerance band so
+    small timing differences between workers don't cause rehash churn.
+
+    Returns:
+        The cost factor now used for new hashes.
+    """
+    if BCRYPT_ROUNDS:
+        set_bcrypt_rounds(int(BCRYPT_ROUNDS))
+    elif BCRYPT_TARGET_MS:
+        rounds = calibrate_bcrypt_rounds(float(BCRYPT_TARGET_MS))
+        set_bcrypt_rounds(rounds, tolerance=BCRYPT_ROUNDS_TOLERANCE)
+    return pwd_context.handler("bcrypt").default_rounds
+
+
+# ---------------------------------------------------------------------------
+# Password hashing executor
+#
+# bcrypt is deliberately slow (~250ms per call), so running it inline in an
+# ``async def`` endpoint stalls the whole event loop. The C implementation
+# releases the GIL, so a small thread pool gives real parallelism while
+# keeping the loop free to serve other requests.
+# ---------------------------------------------------------------------------
+
+PASSWORD_HASH_WORKERS = int(
+    os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1)))
+)
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "32"))
+
+T = TypeVar("T")
+
+
+class HashingPoolBusy(RuntimeError):
+    """Raised when the hashing queue is full and a job cannot be accepted."""
+
+
+class PasswordHasher:
+    """
+    Bounded thread pool for bcrypt work.
+
+    At most ``max_workers`` jobs run at once and at most ``queue_limit`` more
+    may wait for a free worker; anything beyond that is rejected immediately
+    with :class:`HashingPoolBusy` so callers can shed load instead of piling
+    up requests behind a multi-second queue.
+    """
+
+    def __init__(self, max_workers: int, queue_limit: int):
+        self.max_workers = max(1, max_workers)
+        self.queue_limit = max(0, queue_limit)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.hash_seconds_total = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="password-hash",
+                    )
+        return self._executor
+
+    def _record(self, waited: float, elapsed: float) -> None:
+        with self._lock:
+            self.completed += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+            self.hash_seconds_total += elapsed
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        """Run ``func(*args)`` on the pool, raising HashingPoolBusy on overflow."""
+        with self._lock:
+            if self._pending >= self.max_workers + self.queue_limit:
+                self.rejected += 1
+                raise HashingPoolBusy("Password hashing queue is full")
+            self._pending += 1
+
+        submitted = time.perf_counter()
+
+        def job() -> T:
+            started = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                elapsed = time.perf_counter() - started
+                self._record(started - submitted, elapsed)
+                PASSWORD_HASH_WAIT.observe(started - submitted)
+                PASSWORD_HASH_DURATION.observe(elapsed, func.__name__)
+
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), job)
+        finally:
+            # Wall time including the queue: what the request actually paid.
+            record("bcrypt", time.perf_counter() - submitted)
+            with self._lock:
+                self._pending -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of queue depth and wait-time counters."""
+        with self._lock:
+            completed = self.completed
+            return {
+                "workers": self.max_workers,
+                "queue_limit": self.queue_limit,
+                "in_flight": self._pending,
+                "queued": max(0, self._pending - self.max_workers),
+                "completed": completed,
+                "rejected": self.rejected,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+                "wait_seconds_avg": round(
+                    self.wait_seconds_total / completed if completed else 0.0, 6
+                ),
+                "hash_seconds_total": round(self.hash_seconds_total, 6),
+            }
+
+    def shutdown(self) -> None:
+        """Stop the worker threads; a new pool is created on next use."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_LIMIT)
+
+
+async def averify_password(plain_password: str, hashed_password: str) -> bool:
+    """Async variant of :func:`verify_password` that runs on the hashing pool."""
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
+
+
+async def aget_password_hash(password: str) -> str:
+    """Async variant of :func:`get_password_hash` that runs on the hashing pool."""
+    return await password_hasher.run(get_password_hash, password)
+
+
+async def aget_password_hashes(passwords: List[str]) -> List[str]:
+    """
+    Hash many passwords in parallel on the hashing pool.
+
+    At most one job per worker is submitted at a time, so a large batch
+    uses every worker without filling the queue that interactive logins
+    rely on.
+    """
+    slots = asyncio.Semaphore(password_hasher.max_workers)
+
+    async def hash_one(password: str) -> str:
+        async with slots:
+            return await password_hasher.run(get_password_hash, password)
+
+    return list(await asyncio.gather(*(hash_one(p) for p in passwords)))
+
+
 def create_access_token(
     data: Dict[str, Any], expires_delta: Optional[timedelta] = None
 ) -> str:
@@ -76,14 +308,88 @@ def create_access_token(
     return encoded_jwt
 
 
+class TokenCache:
+    """
+    Bounded LRU cache of verified JWT claims.
+
+    Entries are keyed by the SHA-256 digest of the raw token (so tokens are
+    not kept in memory verbatim) and stay valid until the token's own
+    ``exp`` claim. Only successfully verified tokens are ever stored.
+    """
+
+    def __init__(self, max_size: int, enabled: bool = True):
+        self.max_size = max_size
+        self.enabled = enabled and max_size > 0
+        self._entries: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached claims, or None on miss/expiry."""
+        if not self.enabled:
+            return None
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[1])
+
+    def put(self, token: str, claims: Dict[str, Any]) -> None:
+        """Cache verified claims until their ``exp``; tokens without one are skipped."""
+        exp = claims.get("exp")
+        if not self.enabled or not isinstance(exp, (int, float)):
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (float(exp), dict(claims))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+token_cache = TokenCache(JWT_CACHE_SIZE, enabled=JWT_CACHE_ENABLED)
+
+
 def decode_access_token(token: str) -> Dict[str, Any]:
     """
     Decode and validate a JWT access token.
 
+    Verified claims are served from ``token_cache`` until the token expires,
+    so repeat requests with the same token skip signature verification.
+
     Raises:
         JWTError: if the token is invalid/expired.
     """
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached
     payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    token_cache.put(token, payload)
     return payload
 
 
@@ -0,0 +1,294 @@
+"""
+Static file server for the frontend build.
+
+``StaticAssets`` indexes the build directory once (at startup, or again
+after a rebuild when ``FRONTEND_WATCH`` is on), so a request is a dict
+lookup instead of a series of ``stat`` calls, and serves:
+
+- hashed Vite bundles (``assets/index-3f9a1c2b.js``) with
+  ``Cache-Control: public, max-age=31536000, immutable``; other files are
+  cached for ``STATIC_MAX_AGE`` seconds and revalidated by ETag;
+- precompressed ``.br`` / ``.gz`` siblings negotiated via
+  ``Accept-Encoding`` (create them with ``frontend/scripts/precompress.py``,
+  which ``npm run build`` runs as a post-build step);
+- single ``Range`` requests (``206`` / ``416``) for media files;
+- whole files via the ASGI ``http.response.pathsend`` extension when the
+  server offers it, so the server can use zero-copy ``sendfile``; otherwise
+  the file is streamed in chunks read off the event loop.
+
+Only files that were present when the index was built can be served, which
+also rules out path traversal.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import mimetypes
+import os
+import re
+from dataclasses import dataclass, field
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from app.frontend import etag_matches, negotiate_encoding
+
+
+STATIC_MAX_AGE = int(os.getenv("STATIC_MAX_AGE", "3600"))
+IMMUTABLE_MAX_AGE = 31536000
+
+CHUNK_SIZE = 64 * 1024
+
+# Vite names bundles ``<name>-<hash>.<ext>`` (hash of 8+ url-safe chars).
+_HASHED_NAME = re.compile(r"[.-][A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$")
+_SIBLING_SUFFIXES = {".br": "br", ".gz": "gzip"}
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+@dataclass
+class _File:
+    path: Path
+    size: int
+    mtime: float
+    etag: str
+    content_type: str
+    cache_control: str
+    # encoding -> (path, size) of precompressed siblings
+    encodings: Dict[str, Tuple[Path, int]] = field(default_factory=dict)
+
+
+def _content_type(name: str) -> str:
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    if content_type.startswith("text/") or content_type in (
+        "application/javascript",
+        "application/json",
+        "image/svg+xml",
+    ):
+        content_type += "; charset=utf-8"
+    return content_type
+
+
+def is_hashed_asset(relative_path: str) -> bool:
+    """True for content-hashed build output that can be cached forever."""
+    return relative_path.startswith("assets/") and bool(_HASHED_NAME.search(relative_path))
+
+
+class StaticAssets:
+    """
+    ASGI app serving an indexed directory.
+
+    Args:
+        directory: Directory to serve.
+        url_prefix: URL path that maps to ``directory`` (``""`` when the
+            directory mirrors the site root, like the Vite build).
+    """
+
+    def __init__(self, directory: Path, url_prefix: str = ""):
+        self.directory = Path(directory)
+        self.url_prefix = url_prefix.rstrip("/")
+        self.files: Dict[str, _File] = {}
+        self.root_files: FrozenSet[str] = frozenset()
+        self.reindex()
+
+    def reindex(self) -> int:
+        """Rebuild the file index; returns the number of servable files."""
+        files: Dict[str, _File] = {}
+        siblings: List[Tuple[str, str, Path, os.stat_result]] = []
+        if self.directory.is_dir():
+            for root, _, names in os.walk(self.directory):
+                for name in names:
+                    path = Path(root) / name
+                    relative = path.relative_to(self.directory).as_posix()
+                    stat = path.stat()
+                    suffix = path.suffix
+                    if suffix in _SIBLING_SUFFIXES:
+                        original = relative[: -len(suffix)]
+                        siblings.append((original, _SIBLING_SUFFIXES[suffix], path, stat))
+                    files[relative] = _File(
+                        path=path,
+                        size=stat.st_size,
+                        mtime=stat.st_mtime,
+                        etag=f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"',
+                        content_type=_content_type(name),
+                        cache_control=(
+                            f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+                            if is_hashed_asset(relative)
+                            else f"public, max-age={STATIC_MAX_AGE}"
+                        ),
+                    )
+        for original, encoding, path, stat in siblings:
+            entry = files.get(original)
+            # A sibling older than its source is stale (rebuilt without
+            # re-running precompress); ignore it rather than serve old code.
+            if entry is not None and stat.st_mtime >= entry.mtime:
+                entry.encodings[encoding] = (path, stat.st_size)
+        self.files = files
+        self.root_files = frozenset(name for name in files if "/" not in name)
+        return len(files)
+
+    def _relative_path(self, scope: Scope) -> str:
+        path = scope["path"]
+        app_root = scope.get("app_root_path", "")
+        if app_root and path.startswith(app_root):
+            path = path[len(app_root):]
+        if self.url_prefix and path.startswith(self.url_prefix + "/"):
+            path = path[len(self.url_prefix):]
+        return path.lstrip("/")
+
+    def lookup(self, relative_path: str) -> Optional[_File]:
+        return self.files.get(relative_path)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        assert scope["type"] == "http"
+        entry = self.lookup(self._relative_path(scope))
+        if entry is None:
+            await _send_empty(
+                send, 404, [(b"content-type", b"application/json")], b'{"error":"Not found"}'
+            )
+            return
+        if scope["method"] not in ("GET", "HEAD"):
+            await _send_empty(send, 405, [(b"allow", b"GET, HEAD")])
+            return
+        await self.serve(entry, scope, send)
+
+    async def serve(self, entry: _File, scope: Scope, send: Send) -> None:
+        """Send ``entry`` honoring conditional, encoding and range headers."""
+        request_headers = Headers(scope=scope)
+        etags = [entry.etag] + [_variant_etag(entry.etag, e) for e in entry.encodings]
+        headers = [
+            (b"cache-control", entry.cache_control.encode()),
+            (b"last-modified", formatdate(entry.mtime, usegmt=True).encode()),
+            (b"accept-ranges", b"bytes"),
+        ]
+        if entry.encodings:
+            headers.append((b"vary", b"Accept-Encoding"))
+
+        range_header = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        if range_header and if_range and if_range != entry.etag:
+            range_header = None
+        # Byte ranges always address the identity encoding.
+        encoding = "identity" if range_header else negotiate_encoding(
+            request_headers.get("accept-encoding"), entry.encodings
+        )
+        etag = entry.etag if encoding == "identity" else _variant_etag(entry.etag, encoding)
+        headers.append((b"etag", etag.encode()))
+
+        if _not_modified(request_headers, etags, entry.mtime):
+            await _send_empty(send, 304, headers)
+            return
+
+        path, size = (entry.path, entry.size) if encoding == "identity" else entry.encodings[encoding]
+        if encoding != "identity":
+            headers.append((b"content-encoding", encoding.encode()))
+        headers.append((b"content-type", entry.content_type.encode()))
+
+        status, start, length = 200, 0, size
+        if range_header:
+            parsed = _parse_range(range_header, size)
+            if parsed is None:
+                headers.append((b"content-range", f"bytes */{size}".encode()))
+                await _send_empty(send, 416, headers)
+                return
+            if parsed != (0, size):
+                start, length = parsed
+                status = 206
+                headers.append(
+                    (b"content-range", f"bytes {start}-{start + length - 1}/{size}".encode())
+                )
+        headers.append((b"content-length", str(length).encode()))
+
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        if scope["method"] == "HEAD":
+            await send({"type": "http.response.body", "body": b""})
+            return
+        if status == 200 and "http.response.pathsend" in scope.get("extensions", {}):
+            await send({"type": "http.response.pathsend", "path": str(path)})
+            return
+        await _send_file(send, path, start, length)
+
+
+class AssetResponse(Response):
+    """Lets a route handler return an indexed file served by :class:`StaticAssets`."""
+
+    def __init__(self, assets: StaticAssets, entry: _File):
+        super().__init__()
+        self.assets = assets
+        self.entry = entry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.assets.serve(self.entry, scope, send)
+        if self.background is not None:
+            await self.background()
+
+
+def _variant_etag(etag: str, encoding: str) -> str:
+    return f'{etag[:-1]}-{"br" if encoding == "br" else "gz"}"'
+
+
+def _not_modified(headers: Headers, etags: List[str], mtime: float) -> bool:
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etags)
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single ``bytes=`` range into ``(start, length)``.
+
+    Multi-range and malformed headers return the whole file; ranges that
+    cannot be satisfied return None (416).
+    """
+    match = _RANGE.match(header.strip())
+    if match is None:
+        return 0, size
+    first, last = match.groups()
+    if not first and not last:
+        return 0, size
+    if not first:
+        suffix = int(last)
+        if suffix == 0:
+            return None
+        start = max(0, size - suffix)
+        return start, size - start
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return None
+    return start, end - start + 1
+
+
+async def _send_empty(send: Send, status: int, headers, body: bytes = b"") -> None:
+    if status != 304:
+        headers = list(headers) + [(b"content-length", str(len(body)).encode())]
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _send_file(send: Send, path: Path, start: int, length: int) -> None:
+    handle = await asyncio.to_thread(open, path, "rb")
+    try:
+        if start:
+            await asyncio.to_thread(handle.seek, start)
+        remaining = length
+        while remaining > 0:
+            chunk = await asyncio.to_thread(handle.read, min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining > 0:
+            await send({"type": "http.response.body", "body": b""})
+    finally:
+        await asyncio.to_thread(handle.close)
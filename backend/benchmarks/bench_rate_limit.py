@@ -0,0 +1,59 @@
+"""
+Micro-benchmark for the in-memory rate limiter.
+
+Measures the per-call cost of ``RateLimiter.hit`` over the in-memory backend
+with a large number of active keys, plus the memory held per key.
+
+Usage (from the backend directory):
+    python benchmarks/bench_rate_limit.py [--keys 100000] [--calls 1000000]
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.middleware.rate_limit import RateLimiter  # noqa: E402
+from app.middleware.rate_limit_backends import MemoryBackend  # noqa: E402
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--keys", type=int, default=100_000)
+    parser.add_argument("--calls", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    keys = [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}:/api/auth/login" for i in range(args.keys)]
+
+    tracemalloc.start()
+    backend = MemoryBackend()
+    limiter = RateLimiter(backend)
+    for key in keys:
+        await limiter.hit(key, 5, 900)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    sample = [random.choice(keys) for _ in range(args.calls)]
+    hit = limiter.hit
+    started = time.perf_counter()
+    for key in sample:
+        await hit(key, 5, 900)
+    elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    await limiter.evict_expired()
+    evict_elapsed = time.perf_counter() - started
+
+    print(f"active keys:        {len(backend):,}")
+    print(f"memory per key:     {current / args.keys:.0f} bytes (excluding the key string)")
+    print(f"hit:                {elapsed / args.calls * 1e9:.0f} ns/call over {args.calls:,} calls")
+    print(f"evict_expired scan: {evict_elapsed * 1e3:.1f} ms (background task)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
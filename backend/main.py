@@ -4,72 +4,112 @@ FastAPI Backend for TuneEng LSRW Platform
 Main application entry point with CORS configuration and route registration.
 Serves both the API and the frontend static files.
 """
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
-from fastapi.staticfiles import StaticFiles
-import uvicorn
+from fastapi.responses import JSONResponse, PlainTextResponse
+import asyncio
 import os
 from pathlib import Path
 from contextlib import asynccontextmanager
 
-from app.routers import auth, users, practice, leaderboard, profile, tracker, contact
-from app.database import Base, engine, SessionLocal
-from app.models import User
-from app.security import get_password_hash
-from app.middleware.rate_limit import RateLimitMiddleware
+from app.routers import auth, users, practice, leaderboard, profile, tracker, contact, debug
+from app.bootstrap import AUTO_MIGRATE, SEED_DEMO_USER, migrate, seed_demo_user
+from app.database import async_engine, check_database, read_replicas
+from app.deps import require_metrics_access
+from app.security import configure_password_hashing, password_hasher, token_cache
+from app.middleware.rate_limit import RateLimitMiddleware, rate_limiter
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.profiling import RequestProfilingMiddleware
+from app.profiling import PROFILE_REQUESTS_FRACTION
+from app.leaderboards import (
+    LEADERBOARD_COMPACT_INTERVAL,
+    LEADERBOARD_SYNC_INTERVAL,
+    leaderboard_engine,
+    run_compaction,
+)
+from app.frontend import FRONTEND_WATCH, NOT_FOUND, SERVE_FILE, SpaDispatcher, SpaShell
+from app.static_assets import AssetResponse, StaticAssets
+from app.metrics import registry as metrics_registry
 
 
 # Get the project root directory (parent of backend folder)
 PROJECT_ROOT = Path(__file__).parent.parent
 FRONTEND_DIST = PROJECT_ROOT / "frontend" / "dist" / "public"
 
+# index.html is read once and served from memory (see app.frontend)
+spa_shell = SpaShell(FRONTEND_DIST / "index.html")
+spa_shell.load()
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager for startup/shutdown events."""
     # Startup
     print("🚀 Starting TuneEng FastAPI Backend...")
 
-    # Ensure database tables exist
-    Base.metadata.create_all(bind=engine)
+    # Pick the bcrypt cost (BCRYPT_ROUNDS / BCRYPT_TARGET_MS) before any hashing
+    bcrypt_rounds = await asyncio.to_thread(configure_password_hashing)
+    print(f"🔐 bcrypt cost factor: {bcrypt_rounds}")
 
-    # Seed a default demo user for easy login during development
-    try:
-        db = SessionLocal()
-        demo_email = "demo.user@example.com"
-        demo_password = "DemoPass123!"
-
-        existing = db.query(User).filter(User.email == demo_email).first()
-        if not existing:
-            demo_user = User(
-                email=demo_email,
-                full_name="Demo User",
-                username="demouser",
-                hashed_password=get_password_hash(demo_password),
-            )
-            db.add(demo_user)
-            db.commit()
-            print("✅ Seeded demo user:", demo_email, "/", demo_password)
-        else:
-            print("ℹ️  Demo user already exists:", demo_email)
-    except Exception as e:
-        print("⚠️  Failed to seed demo user:", e)
-    finally:
-        try:
-            db.close()
-        except Exception:
-            pass
+    # Schema creation and demo seeding are explicit setup steps
+    # (python -m app.bootstrap migrate); workers only run them when asked.
+    if AUTO_MIGRATE:
+        await asyncio.to_thread(migrate)
+    if SEED_DEMO_USER:
+        await asyncio.to_thread(seed_demo_user)
     
     # Check if frontend is built
-    if FRONTEND_DIST.exists() and (FRONTEND_DIST / "index.html").exists():
+    if spa_shell.loaded or spa_shell.load():
         print(f"✅ Frontend found at {FRONTEND_DIST}")
     else:
         print(f"⚠️  Frontend not built yet. Run 'npm run build' first.")
         print(f"   Expected location: {FRONTEND_DIST}")
     
+    # Leaderboards are served from memory; build them once per worker
+    try:
+        rows = await leaderboard_engine.load()
+        print(f"🏆 Loaded {rows} leaderboard rows")
+    except Exception as e:
+        print(f"⚠️  Leaderboards not loaded ({e}); will retry on first request")
+
+    rate_limit_eviction_task = asyncio.create_task(rate_limiter.run_eviction())
+
+    leaderboard_sync_task = None
+    if LEADERBOARD_SYNC_INTERVAL > 0:
+        leaderboard_sync_task = asyncio.create_task(leaderboard_engine.run_sync())
+
+    leaderboard_compaction_task = None
+    if LEADERBOARD_COMPACT_INTERVAL > 0:
+        leaderboard_compaction_task = asyncio.create_task(run_compaction())
+
+    frontend_watch_task = None
+    if FRONTEND_WATCH:
+        frontend_watch_task = asyncio.create_task(
+            spa_shell.watch(on_change=frontend_static.reindex)
+        )
+        print("👀 Watching frontend build for changes")
+
+    replica_health_task = None
+    if len(read_replicas):
+        replica_health_task = asyncio.create_task(read_replicas.run_health_checks())
+        print(f"✅ Routing reads to {len(read_replicas)} replica(s)")
+
     yield
     # Shutdown
     print("🛑 Shutting down TuneEng FastAPI Backend...")
+    rate_limit_eviction_task.cancel()
+    if leaderboard_sync_task is not None:
+        leaderboard_sync_task.cancel()
+    if leaderboard_compaction_task is not None:
+        leaderboard_compaction_task.cancel()
+    if frontend_watch_task is not None:
+        frontend_watch_task.cancel()
+    if replica_health_task is not None:
+        replica_health_task.cancel()
+    password_hasher.shutdown()
+    await rate_limiter.backend.close()
+    await async_engine.dispose()
+    for replica in read_replicas.engines:
+        await replica.dispose()
 
 
 # Initialize FastAPI app
@@ -98,6 +138,18 @@ app.add_middleware(
     allow_headers=["Authorization", "Content-Type", "X-Requested-With"],
 )
 
+# Sampled request profiling (TUNEENG_PROFILE_REQUESTS), off by default
+if PROFILE_REQUESTS_FRACTION > 0:
+    app.add_middleware(RequestProfilingMiddleware)
+    print(f"🔬 Profiling {PROFILE_REQUESTS_FRACTION:.2%} of requests")
+
+# Request timing - added last so it is the outermost middleware and sees
+# the full request, including rate limiting and CORS.
+app.add_middleware(
+    MetricsMiddleware,
+    server_timing=os.getenv("SERVER_TIMING_ENABLED", "false").lower() in ("1", "true", "yes"),
+)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(users.router, prefix="/api/users", tags=["Users"])
@@ -106,12 +158,40 @@ app.include_router(leaderboard.router, prefix="/api/leaderboard", tags=["Leaderb
 app.include_router(profile.router, prefix="/api/profile", tags=["Profile"])
 app.include_router(tracker.router, prefix="/api/tracker", tags=["Tracker"])
 app.include_router(contact.router, prefix="/api/contact", tags=["Contact"])
+app.include_router(debug.router, prefix="/api/debug", tags=["Debug"])
 
 
 @app.get("/api/health")
 async def health_check():
     """Health check endpoint."""
-    return JSONResponse({"status": "healthy", "service": "tuneeng-api"})
+    return JSONResponse(
+        {
+            "status": "healthy",
+            "service": "tuneeng-api",
+            "password_hashing": password_hasher.stats(),
+            "token_cache": token_cache.stats(),
+        }
+    )
+
+
+@app.get("/api/health/db")
+async def database_health_check():
+    """Database health check with connection pool usage."""
+    result = await check_database()
+    return JSONResponse(result, status_code=200 if result["ok"] else 503)
+
+
+@app.get("/api/metrics", dependencies=[Depends(require_metrics_access)])
+async def metrics():
+    """
+    Request, database and password hashing metrics in Prometheus text format.
+
+    Only for scrapers on ``METRICS_ALLOWED_IPS`` and admins.
+    """
+    return PlainTextResponse(
+        metrics_registry.render(),
+        media_type="text/plain; version=0.0.4",
+    )
 
 
 @app.get("/api/test-logos")
@@ -141,55 +221,59 @@ async def test_logos():
 
 
 # Mount static files (CSS, JS, images, etc.) - must be before catch-all route
+# The build is indexed once; see app.static_assets for caching/compression.
+frontend_static = StaticAssets(FRONTEND_DIST)
+
 if FRONTEND_DIST.exists():
     # Mount assets directory for static files
-    assets_dir = FRONTEND_DIST / "assets"
-    if assets_dir.exists():
-        app.mount("/assets", StaticFiles(directory=assets_dir), name="assets")
+    if (FRONTEND_DIST / "assets").exists():
+        app.mount("/assets", frontend_static, name="assets")
     
     # Mount logos directory for company logos
     # Vite copies public folder contents to dist, so logos should be in dist/public/logos
     logos_dir = FRONTEND_DIST / "logos"
+    logos_app = frontend_static
     if not logos_dir.exists():
         # Fallback to source public folder (for development or if build didn't copy)
         source_logos = PROJECT_ROOT / "frontend" / "client" / "public" / "logos"
         if source_logos.exists():
             logos_dir = source_logos
+            logos_app = StaticAssets(source_logos, url_prefix="/logos")
             print(f"⚠️  Using source logos from: {logos_dir}")
         else:
             print(f"⚠️  Logos not found in dist or source")
     if logos_dir.exists():
-        # List available logos for debugging
-        available_logos = list(logos_dir.glob("*"))
         print(f"✅ Logos mounted from: {logos_dir}")
-        print(f"   Available logos: {[f.name for f in available_logos]}")
-        app.mount("/logos", StaticFiles(directory=logos_dir), name="logos")
+        app.mount("/logos", logos_app, name="logos")
 
     # Mount images directory for illustrative images (e.g. LSRW module cards)
     images_dir = FRONTEND_DIST / "images"
     if images_dir.exists():
         print(f"✅ Images mounted from: {images_dir}")
-        app.mount("/images", StaticFiles(directory=images_dir), name="images")
+        app.mount("/images", frontend_static, name="images")
     
     # Serve root-level static files (favicon, etc.) - handle in catch-all route
 
+# Built once the mounts are known; root files are read from the build index.
+spa_dispatch = SpaDispatcher.from_routes(app.routes, frontend_static)
+
+
+def _frontend_not_built() -> JSONResponse:
+    return JSONResponse(
+        {
+            "error": "Frontend not built",
+            "message": "Please run 'npm run build' to build the frontend",
+            "expected_path": str(spa_shell.index_path),
+        },
+        status_code=503,
+    )
+
 
 # Root endpoint - serve frontend
 @app.get("/")
-async def root():
+async def root(request: Request):
     """Root endpoint - serves the React frontend."""
-    index_path = FRONTEND_DIST / "index.html"
-    if index_path.exists():
-        return FileResponse(index_path)
-    else:
-        return JSONResponse(
-            {
-                "error": "Frontend not built",
-                "message": "Please run 'npm run build' to build the frontend",
-                "expected_path": str(index_path),
-            },
-            status_code=503,
-        )
+    return spa_shell.response(request) or _frontend_not_built()
 
 
 # Catch-all route for SPA - must be last
@@ -199,47 +283,29 @@ async def serve_spa(request: Request, full_path: str):
     """
     Serve the React SPA for all non-API routes.
     This allows React Router to handle client-side routing.
+
+    Unknown API/asset paths 404 and files in the build root (favicon,
+    robots.txt, sitemap.xml, ...) are served directly; see SpaDispatcher.
     """
-    # Don't interfere with API routes
-    if full_path.startswith("api/"):
-        return JSONResponse({"error": "Not found"}, status_code=404)
-    
-    # Don't interfere with static assets (handled by mount)
-    if full_path.startswith("assets/"):
-        return JSONResponse({"error": "Not found"}, status_code=404)
-    
-    # Don't interfere with logos (handled by mount)
-    if full_path.startswith("logos/"):
+    action, entry = spa_dispatch.resolve(full_path)
+    if action == NOT_FOUND:
         return JSONResponse({"error": "Not found"}, status_code=404)
+    if action == SERVE_FILE:
+        return AssetResponse(frontend_static, entry)
 
-    # Don't interfere with images (handled by mount)
-    if full_path.startswith("images/"):
-        return JSONResponse({"error": "Not found"}, status_code=404)
-    
-    # Serve root-level static files if they exist
-    static_files = ["favicon.ico", "robots.txt", "manifest.json", "favicon.png"]
-    if full_path in static_files:
-        static_path = FRONTEND_DIST / full_path
-        if static_path.exists():
-            return FileResponse(static_path)
-        return JSONResponse({"error": "Not found"}, status_code=404)
-    
     # Serve index.html for all other routes (SPA routing)
-    index_path = FRONTEND_DIST / "index.html"
-    if index_path.exists():
-        return FileResponse(index_path)
-    else:
-        return JSONResponse(
-            {
-                "error": "Frontend not built",
-                "message": "Please run 'npm run build' to build the frontend",
-                "expected_path": str(index_path),
-            },
-            status_code=503,
-        )
+    return spa_shell.response(request) or _frontend_not_built()
 
 
 if __name__ == "__main__":
+    import uvicorn
+
+    # Local development: make sure the schema and the demo login exist
+    # before serving (production runs `python -m app.bootstrap migrate`).
+    migrate()
+    if os.getenv("SEED_DEMO_USER", "true").lower() in ("1", "true", "yes"):
+        seed_demo_user()
+
     port = int(os.getenv("PORT", "8000"))
     uvicorn.run(
         "main:app",
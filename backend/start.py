@@ -7,17 +7,26 @@ Run this file to start the entire application (frontend + backend).
 
 Usage:
     python start.py
+    python start.py migrate [--seed-demo]
+    python start.py --import-profile [--top N]
 
 This will:
 1. Check if frontend is built
 2. Build frontend if needed (npm run build)
-3. Start FastAPI server serving both frontend and API
+3. Create missing database tables and the demo user
+4. Start FastAPI server serving both frontend and API
+
+``migrate`` only creates the database tables (run it before starting
+production workers). ``--import-profile`` imports ``main`` under
+``python -X importtime`` and reports where boot time goes.
 """
 
+import argparse
 import subprocess
 import sys
 import os
 import shutil
+import time
 from pathlib import Path
 
 REPO_ROOT = Path(__file__).parent.parent
@@ -104,8 +113,75 @@ def start_backend():
     os.execvp(python_exe, [python_exe, "main.py"])
 
 
+def run_migrate(seed_demo: bool):
+    """Create database tables (and optionally the demo user)."""
+    command = [sys.executable, "-m", "app.bootstrap", "migrate"]
+    if seed_demo:
+        command.append("--seed-demo")
+    return subprocess.run(command, cwd=BACKEND_DIR).returncode
+
+
+def import_profile(top: int = 25):
+    """Import main:app under -X importtime and print the slowest modules."""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    wall = time.perf_counter() - started
+    if result.returncode != 0:
+        print("❌ Importing main failed:")
+        print(result.stderr)
+        return result.returncode
+
+    # Lines look like: "import time:  self [us] | cumulative | [indent]name"
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((int(self_us), int(cumulative_us), name.strip()))
+
+    print("=" * 60)
+    print(f"⏱️  import main: {wall * 1000:.0f} ms wall (including interpreter start)")
+    print("=" * 60)
+    print(f"\nTop {top} modules by self time:")
+    print(f"{'self ms':>9} {'cumul ms':>9}  module")
+    for self_us, cumulative_us, name in sorted(modules, reverse=True)[:top]:
+        print(f"{self_us / 1000:9.1f} {cumulative_us / 1000:9.1f}  {name}")
+
+    print("\nApplication modules (cumulative includes first import of their dependencies):")
+    for self_us, cumulative_us, name in modules:
+        if name == "main" or name.startswith("app"):
+            print(f"{self_us / 1000:9.1f} {cumulative_us / 1000:9.1f}  {name}")
+    return 0
+
+
 def main():
     """Main entry point."""
+    parser = argparse.ArgumentParser(description="Start TuneEng (frontend + backend)")
+    parser.add_argument(
+        "command", nargs="?", choices=["migrate"], help="Only run a setup task"
+    )
+    parser.add_argument(
+        "--seed-demo", action="store_true", help="With migrate: create the demo user"
+    )
+    parser.add_argument(
+        "--import-profile", action="store_true",
+        help="Report per-module import time of main:app",
+    )
+    parser.add_argument(
+        "--top", type=int, default=25, help="Modules to list with --import-profile"
+    )
+    args = parser.parse_args()
+
+    if args.import_profile:
+        sys.exit(import_profile(args.top))
+    if args.command == "migrate":
+        sys.exit(run_migrate(args.seed_demo))
+
     print("=" * 60)
     print("TuneEng - Starting Full Stack Application")
     print("=" * 60)
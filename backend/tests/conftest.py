@@ -0,0 +1,26 @@
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Point the app at a throwaway SQLite file before anything imports app.database.
+_TEST_DB_DIR = tempfile.mkdtemp(prefix="tuneeng-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_TEST_DB_DIR}/test_tuneeng.db")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.database import Base, engine  # noqa: E402
+from app import models  # noqa: E402,F401
+from app.middleware.rate_limit import rate_limiter  # noqa: E402
+
+Base.metadata.create_all(bind=engine)
+
+
+@pytest.fixture(autouse=True)
+def _reset_rate_limiter():
+    """Each test starts with a fresh auth rate-limit budget."""
+    asyncio.run(rate_limiter.clear())
+    yield
@@ -38,3 +38,127 @@ def test_register_and_login_cycle():
     assert data["user"]["email"] == email
 
 
+def test_login_rehashes_outdated_password_cost():
+    from app.database import SessionLocal
+    from app.models import User
+    from app.security import pwd_context, set_bcrypt_rounds
+
+    saved = pwd_context.to_dict()
+    email = "rehash.user@example.com"
+    password = "RehashPass123!"
+    try:
+        set_bcrypt_rounds(4)
+        response = client.post(
+            "/api/auth/register",
+            json={"email": email, "password": password, "full_name": "Rehash User"},
+        )
+        assert response.status_code == 201
+
+        set_bcrypt_rounds(5)
+        response = client.post(
+            "/api/auth/login", json={"email": email, "password": password}
+        )
+        assert response.status_code == 200
+
+        db = SessionLocal()
+        try:
+            stored = db.query(User).filter(User.email == email).one().hashed_password
+        finally:
+            db.close()
+        assert stored.startswith("$2b$05$")
+    finally:
+        pwd_context.load(saved)
+
+
+def _login_token(email: str, password: str) -> str:
+    client.post(
+        "/api/auth/register",
+        json={"email": email, "password": password, "full_name": "Token User"},
+    )
+    response = client.post("/api/auth/login", json={"email": email, "password": password})
+    assert response.status_code == 200
+    return response.json()["access_token"]
+
+
+def test_current_user_dependency_protects_endpoints():
+    token = _login_token("current.user@example.com", "CurrentPass123!")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    me = client.get("/api/auth/me", headers=headers)
+    assert me.status_code == 200
+    assert me.json()["email"] == "current.user@example.com"
+
+    own = client.get(f"/api/users/{me.json()['id']}", headers=headers)
+    assert own.status_code == 200
+    assert own.json() == me.json()
+
+    profile = client.get("/api/profile/", headers=headers)
+    assert profile.status_code == 200
+    assert profile.json()["user_id"] == me.json()["id"]
+
+    bad = {"Authorization": "Bearer not-a-jwt"}
+    assert client.get("/api/tracker/progress", headers=bad).status_code == 401
+    assert client.get("/api/auth/me", headers=bad).status_code == 401
+
+
+def test_register_reports_unique_violations():
+    payload = {
+        "email": "unique.user@example.com",
+        "password": "UniquePass123!",
+        "full_name": "Unique User",
+        "username": "uniqueuser",
+    }
+    assert client.post("/api/auth/register", json=payload).status_code == 201
+
+    response = client.post("/api/auth/register", json=payload)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Email already registered"
+
+    response = client.post(
+        "/api/auth/register", json={**payload, "email": "other.unique@example.com"}
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Username already taken"
+
+
+def test_bulk_register_creates_cohort_in_one_transaction(monkeypatch):
+    from app import deps
+    from app.security import pwd_context, set_bcrypt_rounds
+
+    saved = pwd_context.to_dict()
+    set_bcrypt_rounds(4)
+    try:
+        token = _login_token("cohort.admin@example.com", "CohortAdmin123!")
+        headers = {"Authorization": f"Bearer {token}"}
+        monkeypatch.setattr(deps, "ADMIN_EMAILS", frozenset({"cohort.admin@example.com"}))
+
+        users = [
+            {
+                "email": f"cohort.member{i}@example.com",
+                "password": "CohortPass123!",
+                "full_name": f"Cohort Member {i}",
+            }
+            for i in range(20)
+        ]
+        response = client.post(
+            "/api/auth/register/bulk", json={"users": users}, headers=headers
+        )
+        assert response.status_code == 201
+        assert len(response.json()) == 20
+
+        # A batch containing an existing email is rejected as a whole.
+        response = client.post(
+            "/api/auth/register/bulk",
+            json={"users": [users[0], {**users[1], "email": "cohort.new@example.com"}]},
+            headers=headers,
+        )
+        assert response.status_code == 400
+        assert "cohort.member0@example.com" in response.json()["detail"]
+
+        login = client.post(
+            "/api/auth/login",
+            json={"email": "cohort.member5@example.com", "password": "CohortPass123!"},
+        )
+        assert login.status_code == 200
+    finally:
+        pwd_context.load(saved)
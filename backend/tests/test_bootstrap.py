@@ -0,0 +1,28 @@
+from fastapi.testclient import TestClient
+
+import main
+from app.bootstrap import DEMO_EMAIL, DEMO_PASSWORD, DEMO_PASSWORD_HASH, seed_demo_user
+from app.database import SessionLocal
+from app.models import User
+from app.security import verify_password
+
+
+client = TestClient(main.app)
+
+
+def test_precomputed_demo_hash_matches_password():
+    assert verify_password(DEMO_PASSWORD, DEMO_PASSWORD_HASH)
+
+
+def test_seeded_demo_user_can_log_in():
+    seed_demo_user()
+    seed_demo_user()  # idempotent
+
+    db = SessionLocal()
+    try:
+        assert db.query(User).filter(User.email == DEMO_EMAIL).count() == 1
+    finally:
+        db.close()
+
+    response = client.post("/api/auth/login", json={"email": DEMO_EMAIL, "password": DEMO_PASSWORD})
+    assert response.status_code == 200
@@ -0,0 +1,232 @@
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from fastapi import Request
+from sqlalchemy import event, insert, select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import Session
+
+import main
+from app.database import (
+    AsyncSessionLocal,
+    ReadOnlySessionError,
+    ReplicaSet,
+    SQLiteWriteQueue,
+    async_engine,
+    engine,
+    get_async_db,
+    get_async_read_db,
+    write_transaction,
+)
+from app import database
+from app.models import ListeningQuestion
+
+
+def _request(method: str) -> Request:
+    return Request({"type": "http", "method": method, "headers": [], "path": "/"})
+
+
+client = TestClient(main.app)
+
+
+def test_database_health_reports_pool_usage():
+    response = client.get("/api/health/db")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["ok"] is True
+    assert data["latency_ms"] >= 0
+    assert "checkedout" in data["pool"]
+
+
+def test_database_health_hides_driver_errors(monkeypatch, tmp_path):
+    broken = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/missing/secret-host.db")
+    monkeypatch.setattr(database, "async_engine", broken)
+    response = client.get("/api/health/db")
+    assert response.status_code == 503
+    assert response.json()["error"] == "Database unavailable"
+    assert "secret-host" not in response.text
+    asyncio.run(broken.dispose())
+
+
+def test_sqlite_connections_use_wal_and_busy_timeout():
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+
+    async def check_async():
+        async with async_engine.connect() as conn:
+            return (await conn.execute(text("PRAGMA synchronous"))).scalar()
+
+    assert asyncio.run(check_async()) == 1  # NORMAL
+
+
+def test_write_queue_admits_one_writer_at_a_time():
+    queue = SQLiteWriteQueue(enabled=True)
+    active = []
+    peak = []
+
+    async def writer():
+        async with queue.acquire():
+            active.append(1)
+            peak.append(len(active))
+            await asyncio.sleep(0.001)
+            active.pop()
+
+    async def run():
+        await asyncio.gather(*(writer() for _ in range(10)))
+
+    asyncio.run(run())
+    assert max(peak) == 1
+    assert queue.waiting == 0
+
+
+def test_concurrent_writes_do_not_hit_database_locked():
+    async def insert(i):
+        async with AsyncSessionLocal() as db, write_transaction(db):
+            db.add(ListeningQuestion(content=f"concurrent {i}"))
+
+    async def run():
+        await asyncio.gather(*(insert(i) for i in range(25)))
+
+    asyncio.run(run())
+    with engine.connect() as conn:
+        count = conn.execute(
+            text("SELECT COUNT(*) FROM listening_questions WHERE content LIKE 'concurrent %'")
+        ).scalar()
+    assert count >= 25
+
+
+def test_read_only_session_rejects_writes():
+    async def run():
+        gen = get_async_read_db()
+        db = await gen.__anext__()
+        try:
+            db.add(ListeningQuestion(content="should not be written"))
+            with pytest.raises(ReadOnlySessionError):
+                await db.flush()
+        finally:
+            await gen.aclose()
+
+    asyncio.run(run())
+
+
+def test_get_async_db_commits_only_sessions_that_wrote():
+    commits = []
+
+    def record(session):
+        commits.append(session)
+
+    event.listen(Session, "after_commit", record)
+    try:
+        async def run(write):
+            gen = get_async_db(_request("POST"))
+            db = await gen.__anext__()
+            await db.execute(text("SELECT 1"))
+            if write:
+                db.add(ListeningQuestion(content="committed by teardown"))
+            with pytest.raises(StopAsyncIteration):
+                await gen.__anext__()
+
+        asyncio.run(run(write=False))
+        assert commits == []
+        asyncio.run(run(write=True))
+        assert len(commits) == 1
+    finally:
+        event.remove(Session, "after_commit", record)
+
+
+def test_get_async_db_commits_raw_sql_writes():
+    async def run():
+        async with AsyncSessionLocal() as db, write_transaction(db):
+            db.add(ListeningQuestion(content="raw update before"))
+
+        gen = get_async_db(_request("POST"))
+        db = await gen.__anext__()
+        await db.execute(
+            text("UPDATE listening_questions SET content = 'raw update after' "
+                 "WHERE content = 'raw update before'")
+        )
+        with pytest.raises(StopAsyncIteration):
+            await gen.__anext__()
+
+        async with AsyncSessionLocal() as db:
+            return await db.scalar(
+                select(ListeningQuestion.id).where(ListeningQuestion.content == "raw update after")
+            )
+
+    assert asyncio.run(run()) is not None
+
+    async def read_only_update():
+        gen = get_async_read_db()
+        db = await gen.__anext__()
+        try:
+            with pytest.raises(ReadOnlySessionError):
+                await db.execute(text("DELETE FROM listening_questions"))
+        finally:
+            await gen.aclose()
+
+    asyncio.run(read_only_update())
+
+
+def test_replica_set_round_robins_over_healthy_replicas(tmp_path):
+    replicas = [
+        create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/replica{i}.db")
+        for i in range(3)
+    ]
+    replica_set = ReplicaSet(replicas)
+
+    assert [replica_set.choose() for _ in range(3)] == replicas
+
+    replica_set.mark(replicas[1], healthy=False)
+    assert {replica_set.choose() for _ in range(4)} == {replicas[0], replicas[2]}
+
+    for replica in replicas:
+        replica_set.mark(replica, healthy=False)
+    assert replica_set.choose() is None
+
+    asyncio.run(replica_set.check())
+    assert all(status["healthy"] for status in replica_set.status())
+
+
+def test_replica_check_times_out_connects_without_stalling_others(tmp_path):
+    async def blackhole():
+        await asyncio.sleep(60)
+
+    stalled = create_async_engine("sqlite+aiosqlite://", async_creator=blackhole)
+    healthy = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/replica.db")
+    replica_set = ReplicaSet([stalled, healthy])
+    replica_set.mark(healthy, healthy=False)
+
+    started = time.perf_counter()
+    asyncio.run(replica_set.check(timeout=0.2))
+    assert time.perf_counter() - started < 2
+    assert [status["healthy"] for status in replica_set.status()] == [False, True]
+
+
+def test_routing_session_sends_get_reads_to_replica(tmp_path, monkeypatch):
+    replica = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/replica.db")
+    monkeypatch.setattr(database, "read_replicas", ReplicaSet([replica]))
+
+    async def run():
+        gen = get_async_db(_request("GET"))
+        db = await gen.__anext__()
+        try:
+            read_bind = db.sync_session.get_bind(clause=select(ListeningQuestion))
+            write_bind = db.sync_session.get_bind(clause=insert(ListeningQuestion))
+        finally:
+            await gen.aclose()
+
+        gen = get_async_db(_request("POST"))
+        db = await gen.__anext__()
+        try:
+            post_bind = db.sync_session.get_bind(clause=select(ListeningQuestion))
+        finally:
+            await gen.aclose()
+        return read_bind, write_bind, post_bind
+
+    read_bind, write_bind, post_bind = asyncio.run(run())
+    assert read_bind is replica.sync_engine
+    assert write_bind is async_engine.sync_engine
+    assert post_bind is async_engine.sync_engine
@@ -0,0 +1,102 @@
+import gzip
+import os
+
+from fastapi.testclient import TestClient
+
+import main
+from app.frontend import SpaShell, negotiate_encoding
+
+
+client = TestClient(main.app)
+
+INDEX_HTML = b"<!doctype html><html><head><title>TuneEng</title></head><body>" + b"<div></div>" * 200 + b"</body></html>"
+
+
+def _shell(tmp_path, monkeypatch) -> SpaShell:
+    (tmp_path / "index.html").write_bytes(INDEX_HTML)
+    shell = SpaShell(tmp_path / "index.html")
+    shell.load()
+    monkeypatch.setattr(main, "spa_shell", shell)
+    return shell
+
+
+def test_negotiate_encoding_honors_q_values():
+    available = {"identity": b"", "gzip": b""}
+    assert negotiate_encoding("gzip, deflate", available) == "gzip"
+    assert negotiate_encoding("gzip;q=0, deflate", available) == "identity"
+    assert negotiate_encoding("*", available) == "gzip"
+    assert negotiate_encoding(None, available) == "identity"
+    assert negotiate_encoding("gzip", {"identity": b""}) == "identity"
+
+
+def test_spa_routes_serve_cached_shell_with_etag(tmp_path, monkeypatch):
+    shell = _shell(tmp_path, monkeypatch)
+
+    response = client.get("/practice/listening", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.content == INDEX_HTML  # decoded by the client
+    etag = response.headers["ETag"]
+
+    plain = client.get("/", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in plain.headers
+    assert plain.content == INDEX_HTML
+
+    # Revalidation costs a 304 regardless of which variant was cached.
+    for cached in (etag, plain.headers["ETag"], f"W/{etag}"):
+        not_modified = client.get("/profile", headers={"If-None-Match": cached})
+        assert not_modified.status_code == 304
+        assert not_modified.content == b""
+
+    # Served from memory: deleting the file does not break navigation.
+    os.remove(shell.index_path)
+    assert client.get("/tracker").status_code == 200
+
+
+def test_shell_reloads_when_file_changes(tmp_path, monkeypatch):
+    shell = _shell(tmp_path, monkeypatch)
+    old_etag = shell.etags["identity"]
+    assert not shell.reload_if_changed()
+
+    (tmp_path / "index.html").write_bytes(INDEX_HTML.replace(b"TuneEng", b"TuneEng v2"))
+    os.utime(tmp_path / "index.html", ns=(1, 1))
+    assert shell.reload_if_changed()
+    assert shell.etags["identity"] != old_etag
+    assert gzip.decompress(shell.variants["gzip"]).count(b"v2") == 1
+
+
+def test_missing_build_returns_503(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "spa_shell", SpaShell(tmp_path / "index.html"))
+    response = client.get("/")
+    assert response.status_code == 503
+    assert response.json()["error"] == "Frontend not built"
+
+
+def test_dispatch_serves_root_files_and_404s_reserved_prefixes(tmp_path, monkeypatch):
+    from starlette.routing import Mount
+
+    from app.frontend import NOT_FOUND, SERVE_FILE, SERVE_SHELL, SpaDispatcher
+    from app.static_assets import StaticAssets
+
+    _shell(tmp_path, monkeypatch)
+    (tmp_path / "sitemap.xml").write_bytes(b"<urlset></urlset>")
+    static = StaticAssets(tmp_path)
+    dispatch = SpaDispatcher.from_routes([Mount("/media", app=static)], static)
+    monkeypatch.setattr(main, "frontend_static", static)
+    monkeypatch.setattr(main, "spa_dispatch", dispatch)
+
+    assert dispatch.resolve("sitemap.xml")[0] == SERVE_FILE
+    assert dispatch.resolve("index.html")[0] == SERVE_SHELL
+    assert dispatch.resolve("media/clip.mp3")[0] == NOT_FOUND
+    assert dispatch.resolve("practice/speaking")[0] == SERVE_SHELL
+
+    sitemap = client.get("/sitemap.xml")
+    assert sitemap.status_code == 200
+    assert sitemap.content == b"<urlset></urlset>"
+    assert sitemap.headers["Content-Type"].startswith("application/xml")
+
+    assert client.get("/api/nope").json() == {"error": "Not found"}
+    assert client.get("/images/missing.png").status_code == 404
+    assert client.get("/favicon.ico").status_code == 404
+    assert client.get("/wp-login.php").status_code == 404
@@ -0,0 +1,491 @@
+import asyncio
+import random
+from bisect import bisect_left
+from datetime import date, datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+import main
+from app import deps
+from app.database import SessionLocal
+from app.leaderboards import (
+    OVERALL,
+    Board,
+    LeaderboardEngine,
+    PageCache,
+    compact_buckets,
+    leaderboard_engine,
+    leaderboard_pages,
+)
+from app.models import CohortMember, LeaderboardBucket, LeaderboardScore, User
+from app.ranking import RankIndex
+from app.security import create_access_token, pwd_context, set_bcrypt_rounds
+
+
+client = TestClient(main.app)
+
+
+def _create_users(prefix: str, count: int):
+    db = SessionLocal()
+    try:
+        users = [
+            User(
+                email=f"{prefix}{i}@example.com",
+                full_name=f"{prefix} {i}",
+                username=f"{prefix}{i}",
+                hashed_password="x",
+            )
+            for i in range(count)
+        ]
+        db.add_all(users)
+        db.commit()
+        return [u.id for u in users]
+    finally:
+        db.close()
+
+
+def _auth(user_id: int):
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+
+
+def test_rank_index_matches_a_sorted_list():
+    rng = random.Random(7)
+    RankIndex.LOAD, saved = 4, RankIndex.LOAD  # force many chunk splits/merges
+    try:
+        keys = [rng.randrange(200) for _ in range(300)]
+        index = RankIndex(keys[:50])
+        expected = sorted(keys[:50])
+        for key in keys[50:]:
+            if expected and rng.random() < 0.4:
+                victim = rng.choice(expected)
+                index.remove(victim)
+                expected.remove(victim)
+            else:
+                index.add(key)
+                expected.append(key)
+                expected.sort()
+            assert len(index) == len(expected)
+        assert list(index) == expected
+        assert [index[i] for i in range(len(expected))] == expected
+        assert list(index.islice(10, 40)) == expected[10:40]
+        for probe in range(-1, 201, 7):
+            assert index.index(probe) == bisect_left(expected, probe)
+    finally:
+        RankIndex.LOAD = saved
+
+
+def test_attempts_update_totals_and_boards():
+    ids = _create_users("scorer", 3)
+    asyncio.run(leaderboard_engine.ensure_loaded())
+
+    for user_id, skill, score in (
+        (ids[0], "speaking", 40),
+        (ids[1], "speaking", 70),
+        (ids[0], "writing", 50.5),
+        (ids[2], "reading", 10),
+    ):
+        response = client.post(
+            "/api/practice/attempts",
+            json={"skill_type": skill, "score": score},
+            headers=_auth(user_id),
+        )
+        assert response.status_code == 201
+
+    assert response.json()["streak_days"] == 1
+    assert leaderboard_engine.boards[OVERALL].get(ids[0]) == 90.5
+    assert leaderboard_engine.boards["speaking"].get(ids[1]) == 70
+
+    board = client.get("/api/leaderboard/", params={"limit": 1000}).json()
+    mine = [entry for entry in board if entry["user_id"] in ids]
+    assert [entry["user_id"] for entry in mine] == [ids[0], ids[1], ids[2]]
+    assert mine[0]["skill_scores"] == {
+        "listening": 0.0, "speaking": 40.0, "reading": 0.0, "writing": 50.5,
+    }
+    ranks = [entry["rank"] for entry in board]
+    assert ranks[0] == 1
+    assert all(b - a in (0, 1) for a, b in zip(ranks, ranks[1:]))
+
+    speaking = client.get(
+        "/api/leaderboard/", params={"skill_type": "speaking", "limit": 1000}
+    ).json()
+    mine = [entry for entry in speaking if entry["user_id"] in ids]
+    assert [(e["user_id"], e["total_score"]) for e in mine] == [(ids[1], 70), (ids[0], 40)]
+
+    db = SessionLocal()
+    try:
+        row = db.get(LeaderboardScore, (ids[0], OVERALL))
+        assert (row.score, row.attempts, row.streak_days) == (90.5, 2, 1)
+    finally:
+        db.close()
+
+
+def test_invalid_attempts_and_skills_are_rejected():
+    ids = _create_users("invalid", 1)
+    response = client.post(
+        "/api/practice/attempts",
+        json={"skill_type": "speaking", "score": 101},
+        headers=_auth(ids[0]),
+    )
+    assert response.status_code == 422
+    assert client.get("/api/leaderboard/", params={"skill_type": "cooking"}).status_code == 422
+
+
+def test_workers_converge_through_sync():
+    ids = _create_users("syncer", 2)
+    other_worker = LeaderboardEngine()
+    asyncio.run(other_worker.load())
+
+    client.post(
+        "/api/practice/attempts",
+        json={"skill_type": "listening", "score": 30},
+        headers=_auth(ids[0]),
+    )
+    assert other_worker.boards[OVERALL].get(ids[0]) == 0.0
+
+    asyncio.run(other_worker.sync())
+    assert other_worker.boards[OVERALL].get(ids[0]) == 30
+    assert other_worker.names[ids[0]] == "syncer0"
+
+    fresh = LeaderboardEngine()
+    asyncio.run(fresh.load())
+    assert fresh.boards["listening"].get(ids[0]) == 30
+    assert fresh.streak(ids[0]) == 1
+
+
+def test_board_dense_ranks_match_brute_force():
+    rng = random.Random(3)
+    board = Board({user_id: float(rng.randrange(1, 20)) for user_id in range(60)})
+    for _ in range(200):
+        board.set(rng.randrange(80), float(rng.randrange(0, 20)))
+        scores = board.scores
+        distinct = sorted(set(scores.values()), reverse=True)
+        for user_id, score in scores.items():
+            assert board.dense_rank(score) == distinct.index(score) + 1
+            assert board.count_above(score) == sum(1 for s in scores.values() if s > score)
+        order = sorted(scores, key=lambda u: (-scores[u], u))
+        assert [u for _, u, _ in board.top(len(order))] == order
+        for start in (0, 5, 17):
+            assert [rank for rank, _, _ in board.ranked(start, start + 10)] == [
+                distinct.index(scores[u]) + 1 for u in order[start:start + 10]
+            ]
+
+
+def test_user_rank_reports_percentile_and_neighbors():
+    ids = _create_users("ranked", 4)
+    for user_id, score in zip(ids, (95, 95, 60, 99.5)):
+        client.post(
+            "/api/practice/attempts",
+            json={"skill_type": "reading", "score": score},
+            headers=_auth(user_id),
+        )
+
+    response = client.get(
+        f"/api/leaderboard/user/{ids[1]}/rank",
+        params={"skill_type": "reading", "neighbors": 1},
+    )
+    assert response.status_code == 200
+    body = response.json()
+    board = leaderboard_engine.boards["reading"]
+    assert body["rank"] == board.dense_rank(95)
+    assert body["rank"] == next(
+        e["rank"] for e in body["neighbors"] if e["user_id"] == ids[0]
+    )
+    assert body["ranked_users"] == len(board)
+    assert body["percentile"] == round(
+        100 * (len(board) - board.count_above(95)) / len(board), 2
+    )
+    assert [e["user_id"] for e in body["neighbors"]][1] == ids[1]
+    assert len(body["neighbors"]) == 3
+
+    leader = client.get(f"/api/leaderboard/user/{ids[3]}/rank", params={"skill_type": "reading"})
+    assert leader.json()["total_score"] == 99.5
+
+    newcomer = _create_users("unranked", 1)[0]
+    assert client.get(f"/api/leaderboard/user/{newcomer}/rank").status_code == 404
+
+
+def test_period_windows_roll_forward():
+    today = date(2024, 3, 10)
+    engine = LeaderboardEngine()
+    engine.today = today
+    engine._apply_bucket(1, "speaking", today, 10)
+    engine._apply_bucket(1, "speaking", today - timedelta(days=3), 5)
+    engine._apply_bucket(2, "speaking", today - timedelta(days=20), 40)
+    engine._apply_bucket(2, "speaking", today - timedelta(days=40), 99)  # outside every window
+    engine._apply_bucket(1, "speaking", today, 12)  # absolute: replaces 10
+
+    def scores(period):
+        return dict(engine.windows[period]["speaking"].scores)
+
+    assert scores("daily") == {1: 12}
+    assert scores("weekly") == {1: 17}
+    assert scores("monthly") == {1: 17, 2: 40}
+
+    engine.roll(today + timedelta(days=1))
+    assert scores("daily") == {}
+    assert scores("weekly") == {1: 17}
+
+    engine.roll(today + timedelta(days=11))
+    assert scores("weekly") == {}
+    assert scores("monthly") == {1: 17}
+    assert min(engine.buckets) > engine.today - timedelta(days=30)
+
+
+def test_period_boards_load_from_buckets_and_serve_requests():
+    ids = _create_users("weekly", 2)
+    today = datetime.utcnow().date()
+    db = SessionLocal()
+    try:
+        for user_id, days_ago, score in ((ids[0], 3, 80.0), (ids[1], 0, 20.0)):
+            for skill in ("writing", OVERALL):
+                db.add(LeaderboardBucket(
+                    user_id=user_id, skill_type=skill, granularity="day",
+                    starts_on=today - timedelta(days=days_ago), score=score, attempts=1,
+                ))
+                db.add(LeaderboardScore(user_id=user_id, skill_type=skill, score=score, attempts=1))
+        db.commit()
+    finally:
+        db.close()
+
+    fresh = LeaderboardEngine()
+    asyncio.run(fresh.load())
+    assert fresh.windows["weekly"]["writing"].get(ids[0]) == 80
+    assert fresh.windows["daily"]["writing"].get(ids[0]) == 0
+    assert fresh.windows["daily"][OVERALL].get(ids[1]) == 20
+
+    asyncio.run(leaderboard_engine.load())
+    client.post(
+        "/api/practice/attempts",
+        json={"skill_type": "writing", "score": 70},
+        headers=_auth(ids[1]),
+    )
+    weekly = client.get(
+        "/api/leaderboard/",
+        params={"period": "weekly", "skill_type": "writing", "limit": 1000},
+    ).json()
+    mine = [(e["user_id"], e["total_score"]) for e in weekly if e["user_id"] in ids]
+    assert mine == [(ids[1], 90), (ids[0], 80)]
+
+    rank = client.get(f"/api/leaderboard/user/{ids[0]}/rank", params={"period": "daily"})
+    assert rank.status_code == 404
+    rank = client.get(f"/api/leaderboard/user/{ids[1]}/rank", params={"period": "daily"})
+    assert rank.json()["period"] == "daily"
+    assert rank.json()["total_score"] == 90
+
+
+def test_old_day_buckets_are_compacted_into_months():
+    ids = _create_users("compact", 1)
+    db = SessionLocal()
+    try:
+        for day, score in ((date(2023, 1, 5), 10.0), (date(2023, 1, 9), 15.0), (date(2023, 2, 1), 7.0)):
+            db.add(LeaderboardBucket(
+                user_id=ids[0], skill_type="reading", granularity="day",
+                starts_on=day, score=score, attempts=1,
+            ))
+        db.commit()
+    finally:
+        db.close()
+
+    assert asyncio.run(compact_buckets(today=date(2023, 3, 20))) >= 3
+    assert asyncio.run(compact_buckets(today=date(2023, 3, 20))) == 0
+
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(LeaderboardBucket)
+            .filter(LeaderboardBucket.user_id == ids[0])
+            .order_by(LeaderboardBucket.starts_on)
+            .all()
+        )
+        assert [(r.granularity, r.starts_on, r.score, r.attempts) for r in rows] == [
+            ("month", date(2023, 1, 1), 25.0, 2),
+            ("month", date(2023, 2, 1), 7.0, 1),
+        ]
+    finally:
+        db.close()
+
+
+def test_cohort_leaderboards_are_private_and_track_updates(monkeypatch):
+    ids = _create_users("cohort", 4)
+    member_a, member_b, outsider, admin = ids
+    monkeypatch.setattr(deps, "ADMIN_EMAILS", frozenset({"cohort3@example.com"}))
+    for user_id, score in ((member_a, 40), (member_b, 60), (outsider, 100)):
+        client.post(
+            "/api/practice/attempts",
+            json={"skill_type": "listening", "score": score},
+            headers=_auth(user_id),
+        )
+
+    response = client.post(
+        "/api/leaderboard/cohorts/acme/members",
+        json={"user_ids": [member_a, member_b]},
+        headers=_auth(admin),
+    )
+    assert response.status_code == 204
+    assert client.post(
+        "/api/leaderboard/cohorts/acme/members",
+        json={"user_ids": [member_a]},
+        headers=_auth(member_a),
+    ).status_code == 403
+
+    params = {"cohort": "acme", "skill_type": "listening"}
+    assert client.get("/api/leaderboard/", params=params).status_code == 401
+    assert client.get("/api/leaderboard/", params=params, headers=_auth(outsider)).status_code == 403
+
+    board = client.get("/api/leaderboard/", params=params, headers=_auth(member_a)).json()
+    assert [(e["rank"], e["user_id"]) for e in board] == [(1, member_b), (2, member_a)]
+
+    client.post(
+        "/api/practice/attempts",
+        json={"skill_type": "listening", "score": 30},
+        headers=_auth(member_a),
+    )
+    rank = client.get(
+        f"/api/leaderboard/user/{member_a}/rank",
+        params={**params, "period": "weekly"},
+        headers=_auth(admin),
+    ).json()
+    assert (rank["cohort"], rank["rank"], rank["ranked_users"], rank["total_score"]) == (
+        "acme", 1, 2, 70
+    )
+
+    # Members added later (here via the admin endpoint) join the loaded boards.
+    client.post(
+        "/api/leaderboard/cohorts/acme/members",
+        json={"user_ids": [outsider]},
+        headers=_auth(admin),
+    )
+    board = client.get("/api/leaderboard/", params=params, headers=_auth(outsider)).json()
+    assert [e["user_id"] for e in board] == [outsider, member_a, member_b]
+
+    missing = client.post(
+        "/api/leaderboard/cohorts/acme/members",
+        json={"user_ids": [10**9]},
+        headers=_auth(admin),
+    )
+    assert missing.status_code == 404
+
+
+def test_bulk_registration_can_fill_a_cohort(monkeypatch):
+    (admin,) = _create_users("bulkcohort", 1)
+    monkeypatch.setattr(deps, "ADMIN_EMAILS", frozenset({"bulkcohort0@example.com"}))
+    users = [
+        {
+            "email": f"bulk.cohort{i}@example.com",
+            "password": "CohortPass123!",
+            "full_name": f"Bulk Cohort {i}",
+        }
+        for i in range(3)
+    ]
+    saved = pwd_context.to_dict()
+    set_bcrypt_rounds(4)
+    try:
+        response = client.post(
+            "/api/auth/register/bulk",
+            json={"users": users, "cohort": "bulk-batch"},
+            headers=_auth(admin),
+        )
+    finally:
+        pwd_context.load(saved)
+    assert response.status_code == 201
+
+    db = SessionLocal()
+    try:
+        members = db.query(CohortMember.user_id).filter(CohortMember.cohort == "bulk-batch").all()
+        assert sorted(m.user_id for m in members) == sorted(u["id"] for u in response.json())
+    finally:
+        db.close()
+
+
+def test_unknown_cohorts_are_not_loaded_or_cached(monkeypatch):
+    outsider, admin = _create_users("nocohort", 2)
+    monkeypatch.setattr(deps, "ADMIN_EMAILS", frozenset({"nocohort1@example.com"}))
+    asyncio.run(leaderboard_engine.ensure_loaded())
+    page = client.get("/api/leaderboard/")
+    loaded = list(leaderboard_engine.cohorts)
+    version = leaderboard_engine.version
+
+    for i in range(20):
+        response = client.get(
+            "/api/leaderboard/", params={"cohort": f"junk{i}"}, headers=_auth(outsider)
+        )
+        assert response.status_code == 403
+    empty = client.get("/api/leaderboard/", params={"cohort": "junk0"}, headers=_auth(admin))
+    assert (empty.status_code, empty.json()) == (200, [])
+
+    assert list(leaderboard_engine.cohorts) == loaded
+    assert leaderboard_engine.version == version
+    cached = leaderboard_pages.get((None, None, "all_time", 100), leaderboard_engine.cache_version())
+    assert cached[1] == page.headers["ETag"]
+
+
+def test_cold_cohorts_are_evicted_least_recently_used():
+    ids = _create_users("lru", 3)
+    engine = LeaderboardEngine()
+    engine.cohort_cache_size = 2
+    db = SessionLocal()
+    try:
+        db.add(LeaderboardScore(user_id=ids[0], skill_type=OVERALL, score=5.0, attempts=1))
+        for cohort, user_id in (("lru-a", ids[0]), ("lru-b", ids[1]), ("lru-c", ids[2])):
+            db.add(CohortMember(cohort=cohort, user_id=user_id))
+        db.commit()
+    finally:
+        db.close()
+
+    asyncio.run(engine.ensure_cohort("lru-a"))
+    asyncio.run(engine.ensure_cohort("lru-b"))
+    asyncio.run(engine.ensure_cohort("lru-a"))
+    asyncio.run(engine.ensure_cohort("lru-c"))
+    assert list(engine.cohorts) == ["lru-a", "lru-c"]
+    assert ids[1] not in engine.user_cohorts
+    assert engine.board("all_time", OVERALL, "lru-a").scores == {ids[0]: 5.0}
+
+    engine._apply(ids[0], OVERALL, 8.0, "lru0")
+    assert engine.board("all_time", OVERALL, "lru-a").get(ids[0]) == 8.0
+
+
+def test_leaderboard_pages_are_cached_until_scores_change():
+    ids = _create_users("etag", 1)
+    params = {"skill_type": "speaking", "period": "weekly", "limit": 7}
+    first = client.get("/api/leaderboard/", params=params)
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "no-cache"
+
+    again = client.get("/api/leaderboard/", params=params)
+    assert again.content == first.content
+    assert again.headers["ETag"] == etag
+
+    revalidated = client.get("/api/leaderboard/", params=params, headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+
+    # Re-reading rows that did not change leaves the version (and the cache) alone.
+    asyncio.run(leaderboard_engine.sync())
+    version = leaderboard_engine.version
+    asyncio.run(leaderboard_engine.sync())
+    assert leaderboard_engine.version == version
+
+    client.post(
+        "/api/practice/attempts",
+        json={"skill_type": "speaking", "score": 100},
+        headers=_auth(ids[0]),
+    )
+    changed = client.get("/api/leaderboard/", params=params, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert any(entry["user_id"] == ids[0] for entry in changed.json())
+
+
+def test_page_cache_is_versioned_and_bounded():
+    cache = PageCache(max_entries=2)
+    body, etag = cache.put(("a",), 1, [{"rank": 1}])
+    assert body == b'[{"rank":1}]'
+    assert cache.get(("a",), 1) == (body, etag)
+    assert cache.get(("a",), 2) is None
+
+    cache.put(("b",), 1, [])
+    cache.get(("a",), 1)
+    cache.put(("c",), 1, [])
+    assert cache.get(("b",), 1) is None
+    assert cache.get(("a",), 1) is not None
+    assert len(cache) == 2
@@ -0,0 +1,73 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import main
+from app import deps
+from app.metrics import Histogram, RequestTimings, record, registry
+from app.middleware.metrics import MetricsMiddleware
+
+
+client = TestClient(main.app)
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("demo_seconds", "Demo.", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5, "/a")
+
+    lines = histogram.render()
+    assert 'demo_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{route="/a",le="1"} 2' in lines
+    assert 'demo_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'demo_seconds_count{route="/a"} 3' in lines
+    assert histogram.sum("/a") == 5.55
+
+
+def test_server_timing_value():
+    timings = RequestTimings()
+    timings.add("db", 0.002)
+    timings.add("db", 0.001)
+    assert timings.server_timing(0.01) == 'db;dur=3.00;desc="2x", app;dur=10.00'
+
+
+def test_server_timing_is_never_sent_on_auth_paths():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, server_timing=True)
+
+    @app.post("/api/auth/login")
+    @app.get("/api/tracker/summary")
+    async def handler():
+        record("bcrypt", 0.3)
+        return {}
+
+    timed_client = TestClient(app)
+    assert "bcrypt;dur=" in timed_client.get("/api/tracker/summary").headers["Server-Timing"]
+    assert "Server-Timing" not in timed_client.post("/api/auth/login").headers
+
+
+def test_login_is_measured_and_metrics_are_admin_only(monkeypatch):
+    registry.clear()
+    client.post(
+        "/api/auth/register",
+        json={"email": "metrics.user@example.com", "password": "MetricsPass1!", "full_name": "Metrics User"},
+    )
+    response = client.post(
+        "/api/auth/login",
+        json={"email": "metrics.user@example.com", "password": "MetricsPass1!"},
+    )
+    assert response.status_code == 200
+    assert "Server-Timing" not in response.headers
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    assert client.get("/api/metrics").status_code == 403
+    assert client.get("/api/metrics", headers=headers).status_code == 403
+
+    monkeypatch.setattr(deps, "ADMIN_EMAILS", frozenset({"metrics.user@example.com"}))
+    body = client.get("/api/metrics", headers=headers).text
+    assert (
+        'tuneeng_http_request_duration_seconds_count{method="POST",route="/api/auth/login",status="200"} 1'
+        in body
+    )
+    assert 'tuneeng_password_hash_duration_seconds_count{operation="verify_password"}' in body
+    assert "tuneeng_db_query_duration_seconds_count" in body
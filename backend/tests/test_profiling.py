@@ -0,0 +1,83 @@
+import threading
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import main
+from app import deps
+from app.database import SessionLocal
+from app.middleware.profiling import RequestProfilingMiddleware
+from app.models import User
+from app.profiling import RequestProfileStore, StackSampler
+from app.security import create_access_token
+
+
+client = TestClient(main.app)
+
+
+def _spin(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_sampler_collapses_stacks_of_busy_thread():
+    worker = threading.Thread(target=_spin, args=(0.2,), name="busy-worker")
+    worker.start()
+    sampler = StackSampler(interval=0.005, thread_ids=[worker.ident]).start()
+    worker.join()
+    sampler.stop()
+
+    assert sampler.samples > 0
+    lines = sampler.collapsed().splitlines()
+    stack, count = lines[0].rsplit(" ", 1)
+    assert stack.startswith("busy-worker;")
+    assert stack.endswith("test_profiling:_spin")
+    assert int(count) > 0
+
+
+def test_sampled_requests_are_written_and_rotated(tmp_path):
+    app = FastAPI()
+    app.add_middleware(
+        RequestProfilingMiddleware,
+        fraction=1.0,
+        store=RequestProfileStore(tmp_path, keep=2),
+    )
+
+    @app.get("/slow")
+    async def slow():
+        _spin(0.05)
+        return {"ok": True}
+
+    profiled = TestClient(app)
+    for _ in range(3):
+        assert profiled.get("/slow").status_code == 200
+
+    files = sorted(tmp_path.glob("*.folded"))
+    assert len(files) == 2
+    assert "-GET-slow-" in files[-1].name
+    assert "test_profiling:_spin" in files[-1].read_text()
+
+
+def test_profile_endpoint_is_admin_only_and_opt_in(monkeypatch):
+    db = SessionLocal()
+    try:
+        user = User(email="profiler@example.com", full_name="Profiler", hashed_password="x")
+        db.add(user)
+        db.commit()
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+    finally:
+        db.close()
+
+    monkeypatch.setattr("app.routers.debug.PROFILER_ENABLED", True)
+    assert client.get("/api/debug/profile?seconds=0.05", headers=headers).status_code == 403
+
+    monkeypatch.setattr(deps, "ADMIN_EMAILS", frozenset({"profiler@example.com"}))
+    response = client.get("/api/debug/profile?seconds=0.05&interval_ms=5", headers=headers)
+    assert response.status_code == 200
+    assert int(response.headers["X-Profile-Samples"]) > 0
+    assert response.text.strip()
+
+    monkeypatch.setattr("app.routers.debug.PROFILER_ENABLED", False)
+    assert client.get("/api/debug/profile?seconds=0.05", headers=headers).status_code == 404
@@ -0,0 +1,354 @@
+import asyncio
+
+from app.middleware.rate_limit import RateLimiter
+from app.middleware.rate_limit_backends import MemoryBackend, RedisBackend, SQLiteBackend
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _hits(limiter, key, max_requests, window, count):
+    async def run():
+        return [await limiter.hit(key, max_requests, window) for _ in range(count)]
+
+    return asyncio.run(run())
+
+
+def test_limits_requests_within_window():
+    clock = FakeClock()
+    limiter = RateLimiter(clock=clock)
+
+    results = _hits(limiter, "ip:/login", 3, 60, 4)
+    assert results == [(True, 2), (True, 1), (True, 0), (False, 0)]
+
+
+def test_previous_window_decays_linearly():
+    clock = FakeClock(now=600.0)  # start of a 60s window
+    limiter = RateLimiter(clock=clock)
+    assert all(allowed for allowed, _ in _hits(limiter, "k", 4, 60, 4))
+
+    clock.now = 660.0 + 15  # 25% into the next window: 4 * 0.75 = 3 counted
+    assert _hits(limiter, "k", 4, 60, 2) == [(True, 0), (False, 0)]
+
+    clock.now = 660.0 + 59  # previous window has almost fully decayed
+    assert _hits(limiter, "k", 4, 60, 1)[0][0]
+
+
+def test_retry_after_is_honoured_by_the_sliding_estimate():
+    async def blocked_then_retry(wait_offset):
+        clock = FakeClock(now=9000.0 + 300)  # a third into a 900s window
+        limiter = RateLimiter(clock=clock)
+        for _ in range(6):
+            allowed, _, retry_after = await limiter.hit_with_reset("k", 5, 900)
+        assert not allowed
+        clock.now += retry_after + wait_offset
+        return (await limiter.hit_with_reset("k", 5, 900))[0]
+
+    assert asyncio.run(blocked_then_retry(0))
+    assert not asyncio.run(blocked_then_retry(-1))
+
+
+def test_keys_are_independent_and_evicted_when_idle():
+    clock = FakeClock()
+    backend = MemoryBackend()
+    limiter = RateLimiter(backend, clock=clock)
+    assert _hits(limiter, "a", 1, 60, 2) == [(True, 0), (False, 0)]
+    assert _hits(limiter, "b", 1, 60, 1)[0][0]
+
+    clock.now += 60
+    assert asyncio.run(limiter.evict_expired()) == 0  # previous window still counts
+    clock.now += 60
+    assert asyncio.run(limiter.evict_expired()) == 2
+    assert len(backend) == 0
+
+
+def test_memory_eviction_yields_and_keeps_keys_hit_meanwhile():
+    backend = MemoryBackend()
+    backend.EVICT_CHUNK_SIZE = 2
+    for i in range(6):
+        backend.increment_sync(f"k{i}", 10, 60)
+
+    async def run():
+        eviction = asyncio.create_task(backend.evict_expired(60 * 12))
+        await asyncio.sleep(0)  # first chunk done; k5 is hit again before its turn
+        await backend.increment("k5", 12, 60)
+        return await eviction
+
+    assert asyncio.run(run()) == 5
+    assert list(backend._windows) == ["k5"]
+
+
+def test_sqlite_backend_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "ratelimit.db")
+    clock = FakeClock()
+    first = RateLimiter(SQLiteBackend(path), clock=clock)
+    second = RateLimiter(SQLiteBackend(path), clock=clock)
+
+    assert _hits(first, "ip:/login", 3, 60, 2) == [(True, 2), (True, 1)]
+    assert _hits(second, "ip:/login", 3, 60, 2) == [(True, 0), (False, 0)]
+
+    clock.now += 120
+    assert asyncio.run(second.evict_expired()) == 1
+    asyncio.run(first.backend.close())
+    asyncio.run(second.backend.close())
+
+
+class FakeRedis:
+    """Just enough of the Redis protocol for RedisBackend."""
+
+    def __init__(self):
+        self.data = {}
+        self.writers = []
+        # EXEC replies to swallow (closing the connection instead).
+        self.drop_replies = 0
+
+    async def handle(self, reader, writer):
+        self.writers.append(writer)
+        queued = None
+        while True:
+            command = await self._read_command(reader)
+            if command is None:
+                break
+            name = command[0].upper()
+            if name == b"MULTI":
+                queued = []
+                writer.write(b"+OK\r\n")
+            elif name == b"EXEC":
+                replies = [self._apply(c) for c in queued]
+                queued = None
+                if self.drop_replies:
+                    self.drop_replies -= 1
+                    break
+                writer.write(b"*%d\r\n" % len(replies) + b"".join(replies))
+            elif queued is not None:
+                queued.append(command)
+                writer.write(b"+QUEUED\r\n")
+            else:
+                writer.write(self._apply(command))
+            await writer.drain()
+        writer.close()
+
+    @staticmethod
+    async def _read_command(reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int((await reader.readline())[1:-2])
+            args.append((await reader.readexactly(length + 2))[:-2])
+        return args
+
+    def _apply(self, command):
+        name, args = command[0].upper(), command[1:]
+        if name == b"INCR":
+            self.data[args[0]] = int(self.data.get(args[0], 0)) + 1
+            return b":%d\r\n" % self.data[args[0]]
+        if name == b"EXPIRE":
+            return b":1\r\n"
+        if name == b"GET":
+            value = self.data.get(args[0])
+            if value is None:
+                return b"$-1\r\n"
+            value = str(value).encode()
+            return b"$%d\r\n%s\r\n" % (len(value), value)
+        if name == b"SCAN":
+            keys = [k for k in self.data if k.startswith(args[2].rstrip(b"*"))]
+            return b"*2\r\n$1\r\n0\r\n*%d\r\n" % len(keys) + b"".join(
+                b"$%d\r\n%s\r\n" % (len(k), k) for k in keys
+            )
+        if name == b"DEL":
+            removed = sum(self.data.pop(k, None) is not None for k in args)
+            return b":%d\r\n" % removed
+        return b"-ERR unknown command\r\n"
+
+
+def test_redis_backend_counts_in_shared_windows():
+    async def run():
+        fake = FakeRedis()
+        server = await asyncio.start_server(fake.handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        clock = FakeClock(now=600.0)
+        limiter = RateLimiter(RedisBackend(f"redis://127.0.0.1:{port}/0"), clock=clock)
+        try:
+            results = [await limiter.hit("ip:/login", 2, 60) for _ in range(3)]
+            assert results == [(True, 1), (True, 0), (False, 0)]
+            assert fake.data == {b"ratelimit:ip:/login:10": 3}
+
+            clock.now = 690.0  # halfway into the next window: 3 * 0.5 counted
+            assert await limiter.hit("ip:/login", 2, 60) == (True, 0)
+
+            await limiter.clear()
+            assert fake.data == {}
+        finally:
+            await limiter.backend.close()
+            server.close()
+            await server.wait_closed()
+
+    asyncio.run(run())
+
+
+def test_redis_backend_never_resends_a_written_hit():
+    async def run():
+        fake = FakeRedis()
+        server = await asyncio.start_server(fake.handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        limiter = RateLimiter(RedisBackend(f"redis://127.0.0.1:{port}/0"), clock=FakeClock(600.0))
+        try:
+            assert await limiter.hit("k", 5, 60) == (True, 4)
+
+            # The server closed the idle connection: replaced before sending.
+            for writer in fake.writers:
+                writer.close()
+            await asyncio.sleep(0.05)
+            assert await limiter.hit("k", 5, 60) == (True, 3)
+
+            # EXEC ran but its reply was lost: fail open, counted once.
+            fake.drop_replies = 1
+            assert await limiter.hit("k", 5, 60) == (True, 5)
+            assert limiter.backend_errors == 1
+            assert fake.data == {b"ratelimit:k:10": 3}
+            assert await limiter.hit("k", 5, 60) == (True, 1)
+        finally:
+            await limiter.backend.close()
+            server.close()
+            await server.wait_closed()
+
+    asyncio.run(run())
+
+
+def test_redis_backend_drops_connection_when_auth_fails():
+    async def run():
+        fake = FakeRedis()  # answers AUTH with an error
+        server = await asyncio.start_server(fake.handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        backend = RedisBackend(f"redis://:wrong@127.0.0.1:{port}/0")
+        limiter = RateLimiter(backend, clock=FakeClock())
+        try:
+            for _ in range(2):
+                assert await limiter.hit("k", 1, 60) == (True, 1)
+                assert backend._writer is None
+            assert limiter.backend_errors == 2
+            assert fake.data == {}
+        finally:
+            await backend.close()
+            server.close()
+            await server.wait_closed()
+
+    asyncio.run(run())
+
+
+def test_backend_failure_fails_open():
+    async def run():
+        # Nothing listens on port 1.
+        limiter = RateLimiter(RedisBackend("redis://127.0.0.1:1/0", timeout=0.5))
+        assert await limiter.hit("k", 1, 60) == (True, 1)
+        assert limiter.backend_errors == 1
+
+    asyncio.run(run())
+
+
+def _limited_app(rules, limiter):
+    from fastapi import FastAPI
+
+    from app.middleware.rate_limit import RateLimitMiddleware
+
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, rules=rules, limiter=limiter)
+
+    @app.api_route("/api/{path:path}", methods=["GET", "POST"])
+    async def echo(path: str):
+        return {"path": path}
+
+    return app
+
+
+def test_middleware_applies_longest_matching_rule():
+    from fastapi.testclient import TestClient
+
+    from app.middleware.rate_limit import RateLimitRule
+
+    limiter = RateLimiter(clock=FakeClock(now=600.0))
+    client = TestClient(
+        _limited_app(
+            [
+                RateLimitRule(prefix="/api/", limit=100, window_seconds=60),
+                RateLimitRule(prefix="/api/login", limit=1, window_seconds=60, methods=frozenset({"POST"})),
+            ],
+            limiter,
+        )
+    )
+
+    first = client.post("/api/login")
+    assert first.status_code == 200
+    assert first.headers["RateLimit-Limit"] == "1"
+    assert first.headers["RateLimit-Remaining"] == "0"
+    # Budget used up: the window's one hit must decay, i.e. just past 60s.
+    assert first.headers["RateLimit-Reset"] == "61"
+    assert first.headers["RateLimit-Policy"] == "1;w=60"
+
+    blocked = client.post("/api/login")
+    assert blocked.status_code == 429
+    assert blocked.headers["Retry-After"] == "91"
+
+    # GET is not covered by the login rule, so the broad rule applies.
+    assert client.get("/api/login").headers["RateLimit-Limit"] == "100"
+
+
+def test_middleware_skips_unmatched_paths_and_keys_by_user():
+    from fastapi.testclient import TestClient
+
+    from app.middleware.rate_limit import RateLimitRule
+    from app.security import create_access_token
+
+    limiter = RateLimiter(clock=FakeClock())
+    client = TestClient(
+        _limited_app([RateLimitRule(prefix="/api/feedback", limit=1, window_seconds=60, key="user")], limiter)
+    )
+
+    assert "RateLimit-Limit" not in client.get("/api/other").headers
+
+    alice = {"Authorization": f"Bearer {create_access_token({'sub': '1'})}"}
+    bob = {"Authorization": f"Bearer {create_access_token({'sub': '2'})}"}
+    assert client.post("/api/feedback", headers=alice).status_code == 200
+    assert client.post("/api/feedback", headers=alice).status_code == 429
+    # Same IP, different user: separate budget.
+    assert client.post("/api/feedback", headers=bob).status_code == 200
+
+
+def test_default_rules_give_bulk_registration_its_own_budget():
+    from fastapi.testclient import TestClient
+
+    from app.middleware.rate_limit import DEFAULT_RATE_LIMIT_RULES
+    from app.security import create_access_token
+
+    client = TestClient(_limited_app(DEFAULT_RATE_LIMIT_RULES, RateLimiter(clock=FakeClock())))
+    admin = {"Authorization": f"Bearer {create_access_token({'sub': '1'})}"}
+
+    for _ in range(6):
+        response = client.post("/api/auth/register/bulk", headers=admin)
+        assert response.status_code == 200
+    assert response.headers["RateLimit-Policy"] == "60;w=900"
+
+    statuses = [client.post("/api/auth/register").status_code for _ in range(6)]
+    assert statuses == [200] * 5 + [429]
+
+
+def test_rules_load_from_env(monkeypatch):
+    from app.middleware.rate_limit import DEFAULT_RATE_LIMIT_RULES, load_rules_from_env
+
+    monkeypatch.delenv("RATE_LIMIT_RULES", raising=False)
+    assert load_rules_from_env() == DEFAULT_RATE_LIMIT_RULES
+
+    monkeypatch.setenv(
+        "RATE_LIMIT_RULES",
+        '[{"prefix": "/api/practice", "methods": ["post"], "limit": 30, "window": 60, "key": "user"}]',
+    )
+    (rule,) = load_rules_from_env()
+    assert (rule.prefix, rule.limit, rule.window_seconds, rule.key) == ("/api/practice", 30, 60, "user")
+    assert rule.methods == frozenset({"POST"})
@@ -0,0 +1,112 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from jose import JWTError
+
+from app.security import (
+    HashingPoolBusy,
+    PasswordHasher,
+    TokenCache,
+    aget_password_hash,
+    averify_password,
+    calibrate_bcrypt_rounds,
+    create_access_token,
+    decode_access_token,
+    get_password_hash,
+    password_needs_rehash,
+    pwd_context,
+    set_bcrypt_rounds,
+)
+
+
+def test_async_hash_and_verify_roundtrip():
+    async def run():
+        hashed = await aget_password_hash("CorrectHorse1!")
+        assert await averify_password("CorrectHorse1!", hashed)
+        assert not await averify_password("WrongHorse1!", hashed)
+
+    asyncio.run(run())
+
+
+def test_hasher_rejects_when_queue_is_full():
+    hasher = PasswordHasher(max_workers=1, queue_limit=1)
+    release = threading.Event()
+
+    async def run():
+        blocked = [
+            asyncio.ensure_future(hasher.run(release.wait)) for _ in range(2)
+        ]
+        await asyncio.sleep(0)
+        with pytest.raises(HashingPoolBusy):
+            await hasher.run(lambda: None)
+        release.set()
+        await asyncio.gather(*blocked)
+
+    asyncio.run(run())
+    stats = hasher.stats()
+    assert stats["rejected"] == 1
+    assert stats["completed"] == 2
+    assert stats["in_flight"] == 0
+    assert stats["wait_seconds_max"] >= 0.0
+    hasher.shutdown()
+
+
+@pytest.fixture
+def restore_pwd_context():
+    saved = pwd_context.to_dict()
+    yield
+    pwd_context.load(saved)
+
+
+def test_calibration_respects_bounds():
+    assert calibrate_bcrypt_rounds(0.001, min_rounds=6, max_rounds=9) == 6
+    assert calibrate_bcrypt_rounds(10**9, min_rounds=6, max_rounds=9) == 9
+
+
+def test_set_bcrypt_rounds_flags_old_hashes(restore_pwd_context):
+    set_bcrypt_rounds(5)
+    old_hash = get_password_hash("Secret123!")
+    assert old_hash.startswith("$2b$05$")
+    assert not password_needs_rehash(old_hash)
+
+    set_bcrypt_rounds(7, tolerance=1)
+    assert not password_needs_rehash(old_hash.replace("$05$", "$06$", 1))
+    assert password_needs_rehash(old_hash)
+    assert get_password_hash("Secret123!").startswith("$2b$07$")
+
+
+def test_token_cache_serves_verified_claims_until_expiry():
+    cache = TokenCache(max_size=2)
+    token = create_access_token({"sub": "42"})
+    claims = decode_access_token(token)
+
+    cache.put(token, claims)
+    assert cache.get(token) == claims
+    assert cache.get("not-a-cached-token") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+    cache.put("expired", {"sub": "1", "exp": time.time() - 1})
+    assert cache.get("expired") is None
+
+    cache.put("a", {"exp": time.time() + 60})
+    cache.put("b", {"exp": time.time() + 60})
+    assert cache.get(token) is None  # evicted as least recently used
+    assert cache.stats()["size"] == 2
+
+
+def test_decode_access_token_rejects_tampered_token_after_caching():
+    token = create_access_token({"sub": "7"})
+    assert decode_access_token(token)["sub"] == "7"
+    assert decode_access_token(token)["sub"] == "7"
+    with pytest.raises(JWTError):
+        decode_access_token(token[:-2] + ("AA" if token[-2:] != "AA" else "BB"))
+
+
+def test_disabled_token_cache_never_stores():
+    cache = TokenCache(max_size=10, enabled=False)
+    cache.put("t", {"exp": time.time() + 60})
+    assert cache.get("t") is None
+    assert cache.stats()["size"] == 0
@@ -0,0 +1,105 @@
+import asyncio
+import gzip
+import os
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.static_assets import StaticAssets, is_hashed_asset
+
+
+BUNDLE = b"console.log('tuneeng');\n" * 200
+
+
+def _build(tmp_path):
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "logos").mkdir()
+    bundle = tmp_path / "assets" / "index-3f9a1c2b.js"
+    bundle.write_bytes(BUNDLE)
+    (tmp_path / "assets" / "index-3f9a1c2b.js.gz").write_bytes(gzip.compress(BUNDLE))
+    (tmp_path / "logos" / "acme.png").write_bytes(bytes(range(256)) * 4)
+    static = StaticAssets(tmp_path)
+    app = FastAPI()
+    app.mount("/assets", static)
+    app.mount("/logos", static)
+    return static, TestClient(app)
+
+
+def test_hashed_assets_are_immutable():
+    assert is_hashed_asset("assets/index-3f9a1c2b.js")
+    assert not is_hashed_asset("assets/index.js")
+    assert not is_hashed_asset("logos/company-logo.png")
+
+
+def test_serves_precompressed_sibling_with_caching_headers(tmp_path):
+    _, client = _build(tmp_path)
+
+    response = client.get("/assets/index-3f9a1c2b.js", headers={"Accept-Encoding": "gzip, br"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+    assert response.headers["Content-Type"].startswith("text/javascript")
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.content == BUNDLE
+
+    plain = client.get("/assets/index-3f9a1c2b.js", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in plain.headers
+    assert plain.headers["Content-Length"] == str(len(BUNDLE))
+
+    logo = client.get("/logos/acme.png")
+    assert logo.headers["Cache-Control"] == "public, max-age=3600"
+    revalidated = client.get("/logos/acme.png", headers={"If-None-Match": logo.headers["ETag"]})
+    assert revalidated.status_code == 304
+
+    assert client.get("/assets/missing.js").status_code == 404
+    assert client.get("/assets/../../etc/passwd").status_code == 404
+
+
+def test_range_requests(tmp_path):
+    _, client = _build(tmp_path)
+
+    partial = client.get("/logos/acme.png", headers={"Range": "bytes=10-19"})
+    assert partial.status_code == 206
+    assert partial.headers["Content-Range"] == "bytes 10-19/1024"
+    assert partial.content == bytes(range(10, 20))
+
+    suffix = client.get("/logos/acme.png", headers={"Range": "bytes=-4"})
+    assert suffix.content == bytes(range(252, 256))
+
+    unsatisfiable = client.get("/logos/acme.png", headers={"Range": "bytes=5000-"})
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["Content-Range"] == "bytes */1024"
+
+    # A stale If-Range validator means "send the whole thing".
+    stale = client.get("/logos/acme.png", headers={"Range": "bytes=0-1", "If-Range": '"old"'})
+    assert stale.status_code == 200
+    assert len(stale.content) == 1024
+
+
+def test_stale_sibling_is_ignored(tmp_path):
+    static, _ = _build(tmp_path)
+    os.utime(tmp_path / "assets" / "index-3f9a1c2b.js.gz", (0, 0))
+    static.reindex()
+    assert static.lookup("assets/index-3f9a1c2b.js").encodings == {}
+
+
+def test_uses_pathsend_when_server_supports_it(tmp_path):
+    static, _ = _build(tmp_path)
+    messages = []
+
+    async def receive():
+        return {"type": "http.request"}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/logos/acme.png",
+        "headers": [],
+        "extensions": {"http.response.pathsend": {}},
+    }
+    asyncio.run(static(scope, receive, send))
+    assert messages[0]["status"] == 200
+    assert messages[1] == {"type": "http.response.pathsend", "path": str(tmp_path / "logos" / "acme.png")}
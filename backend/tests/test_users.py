@@ -0,0 +1,70 @@
+from fastapi.testclient import TestClient
+
+import main
+from app import deps
+from app.database import SessionLocal
+from app.models import User
+from app.security import create_access_token
+
+
+client = TestClient(main.app)
+
+
+def _create_users(prefix: str, count: int):
+    db = SessionLocal()
+    try:
+        users = [
+            User(
+                email=f"{prefix}{i}@example.com",
+                full_name=f"{prefix} {i}",
+                username=f"{prefix}{i}",
+                hashed_password="x",
+            )
+            for i in range(count)
+        ]
+        db.add_all(users)
+        db.commit()
+        return [u.id for u in users]
+    finally:
+        db.close()
+
+
+def _auth(user_id: int):
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+
+
+def test_users_are_paginated_by_keyset_cursor():
+    ids = _create_users("pager", 5)
+    headers = _auth(ids[0])
+
+    seen = []
+    after = ids[0] - 1
+    while True:
+        response = client.get(
+            "/api/users/", params={"limit": 2, "after": after}, headers=headers
+        )
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page) <= 2
+        assert all("hashed_password" not in user for user in page)
+        seen.extend(user["id"] for user in page)
+        after = response.headers.get("X-Next-Cursor")
+        if after is None:
+            break
+
+    assert seen[:5] == ids
+    assert seen == sorted(seen)
+
+
+def test_user_export_streams_json_for_admins_only(monkeypatch):
+    ids = _create_users("exporter", 3)
+    headers = _auth(ids[0])
+
+    assert client.get("/api/users/export", headers=headers).status_code == 403
+
+    monkeypatch.setattr(deps, "ADMIN_EMAILS", frozenset({"exporter0@example.com"}))
+    monkeypatch.setattr("app.routers.users.EXPORT_BATCH_SIZE", 2)
+    response = client.get("/api/users/export", headers=headers)
+    assert response.status_code == 200
+    exported = {user["id"] for user in response.json()}
+    assert set(ids) <= exported
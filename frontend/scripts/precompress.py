@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""Write .gz (and .br, if the brotli package is installed) siblings for dist/public"""
+
+import gzip
+import sys
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DIST = Path(sys.argv[1]) if len(sys.argv) > 1 else PROJECT_ROOT / "dist" / "public"
+
+# Already-compressed formats (images, fonts, media) gain nothing.
+COMPRESSIBLE = {
+    ".js", ".mjs", ".css", ".html", ".svg", ".json", ".txt", ".xml", ".map", ".wasm", ".ico",
+}
+MIN_SIZE = 1024
+
+
+def write_sibling(source: Path, suffix: str, data: bytes) -> bool:
+    target = source.with_name(source.name + suffix)
+    if target.exists() and target.stat().st_mtime >= source.stat().st_mtime:
+        return False
+    target.write_bytes(data)
+    return True
+
+
+if not DIST.exists():
+    print(f"⚠️  Build output not found at {DIST}")
+    sys.exit(0)
+
+written = 0
+for path in sorted(DIST.rglob("*")):
+    if not path.is_file() or path.suffix not in COMPRESSIBLE or path.stat().st_size < MIN_SIZE:
+        continue
+    data = path.read_bytes()
+    gzipped = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(gzipped) < len(data):
+        written += write_sibling(path, ".gz", gzipped)
+    if brotli is not None:
+        encoded = brotli.compress(data, quality=11)
+        if len(encoded) < len(data):
+            written += write_sibling(path, ".br", encoded)
+
+print(f"✅ Precompressed {written} file(s) in {DIST}" + ("" if brotli else " (gzip only; pip install brotli for .br)"))